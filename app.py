@@ -1,432 +1,641 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, send_file, stream_with_context, url_for, g
 from flask_cors import CORS
-from whitenoise import WhiteNoise
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, quote_plus
+from urllib.parse import urljoin, quote, quote_plus
 import re
-import time
 import os
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from fetch_pool import fetch_pool, TokenBucket
+import assets
+import http_cache
+import http_client
+import metrics
+import parsing
+from pages import FetchContext, fetch_page, page_store
+import mirrors
+from mirrors import mirror_pool
+from scheduler import scheduler, priority
+from warmer import Warmer
+from search_index import SearchIndex
+from singleflight import SingleFlight, FlightAbandoned
+from image_cache import ImageCache, IMAGE_MAX_BYTES
+from cache import StaleWhileRevalidateCache, ResultCache, MemoryBackend, SQLiteBackend, normalize_url, has_errors
+
+# Minify, fingerprint and precompress the static assets on startup (set
+# ASSETS_BUILD=0 when `python assets.py` runs at deploy time instead). This
+# has to happen before WhiteNoise indexes the static folder
+ASSETS_BUILD = os.environ.get('ASSETS_BUILD', '1') == '1'
+if ASSETS_BUILD:
+    try:
+        asset_manifest = assets.build()
+    except OSError as e:
+        print(f"Failed to build static assets, serving them unbuilt: {e}")
+        asset_manifest = assets.load_manifest()
+else:
+    asset_manifest = assets.load_manifest()
 
 app = Flask(__name__)
-app.wsgi_app = WhiteNoise(app.wsgi_app, root="static/")
+app.wsgi_app = assets.AssetServer(app.wsgi_app, root=assets.STATIC_DIR, prefix="static/")
 CORS(app)
 
 # Configure static folder
 app.static_folder = 'static'
 
-def extract_player_urls(base_url):
+# Latest uploads cache: served fresh for LATEST_CACHE_TTL seconds, then served
+# stale for up to LATEST_CACHE_MAX_STALE more while one background refresh runs
+LATEST_CACHE_TTL = float(os.environ.get('LATEST_CACHE_TTL', '300'))
+LATEST_CACHE_MAX_STALE = float(os.environ.get('LATEST_CACHE_MAX_STALE', '3600'))
+
+# Extraction result cache, keyed by normalized content URL. Use the sqlite
+# backend to keep results across restarts and share them between workers
+EXTRACT_CACHE_BACKEND = os.environ.get('EXTRACT_CACHE_BACKEND', 'memory')
+EXTRACT_CACHE_PATH = os.environ.get('EXTRACT_CACHE_PATH', 'extract_cache.sqlite3')
+EXTRACT_CACHE_MAX_ENTRIES = int(os.environ.get('EXTRACT_CACHE_MAX_ENTRIES', '500'))
+EXTRACT_CACHE_TTL = float(os.environ.get('EXTRACT_CACHE_TTL', '3600'))
+EXTRACT_CACHE_ERROR_TTL = float(os.environ.get('EXTRACT_CACHE_ERROR_TTL', '60'))
+
+# Number of following episodes extracted in the background when one is opened
+EPISODE_PREFETCH_COUNT = int(os.environ.get('EPISODE_PREFETCH_COUNT', '2'))
+prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch')
+_prefetching = set()
+_prefetch_lock = threading.Lock()
+
+# Background warmer: pre-extracts the latest uploads every WARMER_INTERVAL
+# seconds, spending at most WARMER_RATE upstream requests per second
+WARMER_ENABLED = os.environ.get('WARMER_ENABLED', '1') == '1'
+WARMER_INTERVAL = float(os.environ.get('WARMER_INTERVAL', '600'))
+WARMER_RATE = float(os.environ.get('WARMER_RATE', '2'))
+WARMER_BURST = float(os.environ.get('WARMER_BURST', '6'))
+# A run's claim expires a little before the claiming worker runs again, so
+# its next run is not skipped for its own claim
+WARMER_CLAIM_SHARE = 0.9
+
+# Batch extraction: titles of all /api/extract/batch calls share one pool of
+# BATCH_MAX_WORKERS extractions and one budget of BATCH_RATE upstream requests
+# per second
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', '100'))
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '8'))
+BATCH_RATE = float(os.environ.get('BATCH_RATE', '20'))
+BATCH_BURST = float(os.environ.get('BATCH_BURST', '40'))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+batch_budget = TokenBucket(BATCH_RATE, BATCH_BURST)
+
+# Series episode lists are served in pages of SERIES_EPISODE_PAGE_SIZE
+# episodes. /api/series/episodes resolves players for at most
+# SERIES_RESOLVE_MAX episodes of a page per call
+SERIES_EPISODE_PAGE_SIZE = int(os.environ.get('SERIES_EPISODE_PAGE_SIZE', '50'))
+SERIES_EPISODE_MAX_PAGE_SIZE = int(os.environ.get('SERIES_EPISODE_MAX_PAGE_SIZE', '200'))
+SERIES_RESOLVE_MAX = int(os.environ.get('SERIES_RESOLVE_MAX', '10'))
+# Kept apart from the batch pool, so a page load never waits behind batch work
+episode_executor = ThreadPoolExecutor(max_workers=SERIES_RESOLVE_MAX, thread_name_prefix='episodes')
+
+# Local search index over every title seen in latest uploads, search results
+# and extractions. A search is answered from memory when it has at least
+# SEARCH_INDEX_MIN_RESULTS exact or prefix hits (typo matches do not count) or
+# the same query went upstream within SEARCH_INDEX_QUERY_TTL seconds,
+# otherwise upstream is asked
+SEARCH_INDEX_ENABLED = os.environ.get('SEARCH_INDEX_ENABLED', '1') == '1'
+SEARCH_INDEX_MAX_DOCUMENTS = int(os.environ.get('SEARCH_INDEX_MAX_DOCUMENTS', '5000'))
+SEARCH_INDEX_MIN_RESULTS = int(os.environ.get('SEARCH_INDEX_MIN_RESULTS', '3'))
+SEARCH_INDEX_QUERY_TTL = float(os.environ.get('SEARCH_INDEX_QUERY_TTL', '3600'))
+search_index = SearchIndex(SEARCH_INDEX_MAX_DOCUMENTS, SEARCH_INDEX_QUERY_TTL)
+SEARCH_RESULT_FIELDS = ('title', 'url', 'image_url', 'rating', 'type')
+
+# Poster proxy: image_url in API results points at /img, which fetches every
+# poster once, keeps it in an on-disk LRU and serves it as immutable for
+# IMAGE_MAX_AGE seconds
+IMAGE_PROXY_ENABLED = os.environ.get('IMAGE_PROXY_ENABLED', '1') == '1'
+IMAGE_MAX_AGE = int(os.environ.get('IMAGE_MAX_AGE', '31536000'))
+image_cache = ImageCache()
+
+def _fetch_content_page(base_url, pages):
+    """
+    Fetch a movie or series page, returns (soup, title, is_series)
+    """
+    page = pages.get(base_url)
+    soup = page.parsed('content', parsing.parse_content_page)
+    title, is_series = inspect_content_page(base_url, soup)
+    
+    return soup, title, is_series
+
+def inspect_content_page(base_url, soup):
+    """
+    Read the title of a parsed content page and whether it is a series
+    """
+    # Extract title
+    title_element = soup.find('h1', class_='entry-title')
+    title = title_element.get_text().strip() if title_element else "Unknown Title"
+    
+    # Check if this is a series page by looking for episode links
+    episode_links = soup.find_all('a', href=re.compile(r'/eps/'))
+    is_series = '/tv/' in base_url or len(episode_links) > 0 or 'episode' in title.lower()
+    
+    return title, bool(is_series and episode_links)
+
+def extract_player_urls(base_url, budget=None):
     """
     Extract all player URLs from a movie or series page
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    # Every distinct page is fetched only once during this extraction
+    pages = FetchContext(budget)
     
     try:
         # Get the main page
-        response = requests.get(base_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup, title, is_series = _fetch_content_page(base_url, pages)
         
-        # Extract title
-        title_element = soup.find('h1', class_='entry-title')
-        title = title_element.get_text().strip() if title_element else "Unknown Title"
-        
-        # Check if this is a series page by looking for episode links
-        episode_links = soup.find_all('a', href=re.compile(r'/eps/'))
-        is_series = '/tv/' in base_url or len(episode_links) > 0 or 'episode' in title.lower()
-        
-        if is_series and episode_links:
+        if is_series:
             # This is a series page with episodes, extract episode information
-            return extract_series_episodes(base_url, soup, headers, title)
+            result = extract_series_episodes(base_url, soup, title)
         else:
             # This is a movie page, extract player URLs directly
-            return extract_movie_players(base_url, soup, headers, title)
+            result = extract_movie_players(base_url, soup, title, pages)
+        
+        index_result(result)
+        return result
             
     except Exception as e:
         return {"error": f"Failed to extract players: {str(e)}"}
 
-def search_movies_series(query, content_type=None):
+def stream_player_urls(base_url):
     """
-    Search for movies and series on the website
+    Extract player URLs from a movie or series page as a stream of events.
+    
+    Yields a 'meta' event with the title and server list as soon as the main
+    page is parsed, a 'player' event for every player as its iframe resolves
+    and finally a 'done' event carrying the complete result.
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    pages = FetchContext()
+    
+    try:
+        soup, title, is_series = _fetch_content_page(base_url, pages)
+    except Exception as e:
+        result = {"error": f"Failed to extract players: {str(e)}"}
+        yield {'event': 'error', 'error': result['error']}
+        yield {'event': 'done', 'result': result}
+        return
+    
+    if is_series:
+        # Series results only carry the episode list, nothing left to stream
+        result = extract_series_episodes(base_url, soup, title)
+        index_result(result)
+        yield {'event': 'meta', **result}
+        yield {'event': 'done', 'result': result}
+        return
+    
+    player_pages = movie_player_pages(base_url, soup)
+    yield {
+        'event': 'meta',
+        'title': title,
+        'url': base_url,
+        'type': 'movie',
+        'players': player_pages
+    }
+    
+    players = [None] * len(player_pages)
+    urls = [info['player_page_url'] for info in player_pages]
+    for index, (iframe_url, error) in fetch_pool.imap_unordered(_fetch_iframe_url, urls, pages, admit=pages.admit):
+        info = player_pages[index]
+        players[index] = player_entry(info['server_name'], info['player_page_url'], iframe_url, error)
+        yield {'event': 'player', 'index': index, 'player': players[index]}
+    
+    result = {
+        'title': title,
+        'url': base_url,
+        'type': 'movie',
+        'players': players
     }
+    index_result(result)
+    yield {'event': 'done', 'result': result}
+
+def build_search_url(query, content_type=None):
+    """
+    Construct the upstream search URL
+    """
+    search_url = f"{mirror_pool.base_url}/?s={quote_plus(query)}"
+    
+    # Add content type filter if specified
+    if content_type:
+        search_url += f"&post_type[]={content_type}"
+    else:
+        # Search both movies and series
+        search_url += "&post_type[]=post&post_type[]=tv"
     
+    return search_url
+
+def search_movies_series(query, content_type=None):
+    """
+    Search for movies and series on the website
+    """
     try:
         # Construct search URL
-        search_url = f"https://new17.ngefilm.site/?s={quote_plus(query)}"
-        
-        # Add content type filter if specified
-        if content_type:
-            search_url += f"&post_type[]={content_type}"
-        else:
-            # Search both movies and series
-            search_url += "&post_type[]=post&post_type[]=tv"
-        
-        print(f"Searching: {search_url}")
+        search_url = build_search_url(query, content_type)
         
         # Perform search
-        response = requests.get(search_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find search results
-        results = []
+        page = fetch_page(search_url)
+        soup = page.parsed('search', parsing.parse_search_page)
         
-        # Look for movie/series items in the search results
-        items = soup.find_all('article', class_='item-infinite')
-        if not items:
-            # Try alternative selectors
-            items = soup.find_all('article', attrs={'itemscope': True})
+        return parse_search_results(query, soup)
         
-        for item in items:
-            try:
-                # Extract title
-                title_element = item.find('h2', class_='entry-title')
-                if not title_element:
-                    title_element = item.find('h2')
-                
-                title = ""
-                if title_element:
-                    title_link = title_element.find('a')
-                    if title_link:
-                        title = title_link.get_text().strip()
-                
-                # Extract URL
-                url = ""
-                title_link = item.find('a', href=True) if title_element else None
+    except Exception as e:
+        return {"error": f"Search failed: {str(e)}"}
+
+def parse_search_results(query, soup):
+    """
+    Build the search API result from a parsed search page
+    """
+    # Find search results
+    results = []
+    
+    # Look for movie/series items in the search results
+    items = soup.find_all('article', class_='item-infinite')
+    if not items:
+        # Try alternative selectors
+        items = soup.find_all('article', attrs={'itemscope': True})
+    
+    for item in items:
+        try:
+            # Extract title
+            title_element = item.find('h2', class_='entry-title')
+            if not title_element:
+                title_element = item.find('h2')
+    
+            title = ""
+            if title_element:
+                title_link = title_element.find('a')
                 if title_link:
-                    url = title_link.get('href')
-                
-                # Extract image
-                image_url = ""
-                img_element = item.find('img')
-                if img_element:
-                    image_url = img_element.get('data-src') or img_element.get('src')
-                
-                # Extract rating
-                rating = ""
-                rating_element = item.find(class_=re.compile(r'rating'))
-                if rating_element:
-                    rating_text = rating_element.get_text().strip()
-                    # Extract numeric rating if possible
-                    rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                    if rating_match:
-                        rating = rating_match.group(1)
-                
-                # Extract type (movie or series)
-                type_indicator = "Unknown"
-                if '/tv/' in url:
-                    type_indicator = "Series"
-                elif '/eps/' in url:
-                    type_indicator = "Episode"
-                else:
-                    type_indicator = "Movie"
-                
-                # Only add if we have a title and URL
-                if title and url:
-                    results.append({
-                        'title': title,
-                        'url': url,
-                        'image_url': image_url,
-                        'rating': rating,
-                        'type': type_indicator
-                    })
-                    
+                    title = title_link.get_text().strip()
+    
+            # Extract URL
+            url = ""
+            title_link = item.find('a', href=True) if title_element else None
+            if title_link:
+                url = title_link.get('href')
+    
+            # Extract image
+            image_url = ""
+            img_element = item.find('img')
+            if img_element:
+                image_url = img_element.get('data-src') or img_element.get('src')
+    
+            # Extract rating
+            rating = ""
+            rating_element = item.find(class_=re.compile(r'rating'))
+            if rating_element:
+                rating_text = rating_element.get_text().strip()
+                # Extract numeric rating if possible
+                rating_match = re.search(r'(\d+\.?\d*)', rating_text)
+                if rating_match:
+                    rating = rating_match.group(1)
+    
+            # Extract type (movie or series)
+            type_indicator = "Unknown"
+            if '/tv/' in url:
+                type_indicator = "Series"
+            elif '/eps/' in url:
+                type_indicator = "Episode"
+            else:
+                type_indicator = "Movie"
+    
+            # Only add if we have a title and URL
+            if title and url:
+                results.append({
+                    'title': title,
+                    'url': url,
+                    'image_url': image_url,
+                    'rating': rating,
+                    'type': type_indicator
+                })
+    
+        except Exception as e:
+            print(f"Error processing search result: {e}")
+            continue
+    
+    # If no results found with article selector, try a broader approach
+    if not results:
+        seen_urls = set()
+        # Look for any links that might be content
+        links = soup.find_all('a', href=re.compile(r'/((?!page)[\w\-])+/'))
+        for link in links:
+            try:
+                href = link.get('href')
+                text = link.get_text().strip()
+    
+                # Skip navigation and utility links
+                if any(skip_word in text.lower() for skip_word in ['page', 'next', 'prev', 'berikut', 'sebelum']):
+                    continue
+    
+                # Only include links that look like content
+                if href and ('/tv/' in href or '/eps/' in href or re.match(r'^https?://[^/]+/[\w\-]+/$', href)):
+                    # Make absolute URL
+                    if href.startswith('/'):
+                        href = urljoin(mirror_pool.base_url, href)
+                    elif not href.startswith('http'):
+                        href = urljoin(mirror_pool.base_url, href)
+    
+                    # Only add if it's not already in results
+                    if href not in seen_urls:
+                        seen_urls.add(href)
+                        results.append({
+                            'title': text or "Untitled",
+                            'url': href,
+                            'image_url': '',
+                            'rating': '',
+                            'type': 'Series' if '/tv/' in href else 'Movie'
+                        })
+    
             except Exception as e:
-                print(f"Error processing search result: {e}")
                 continue
+    
+    return {
+        'query': query,
+        'results': results,
+        'total_results': len(results)
+    }
+
+def get_latest_uploads():
+    """
+    Get latest uploads from the main page
+    """
+    try:
+        # Get the main page
+        page = fetch_page(f"{mirror_pool.base_url}/")
+        soup = page.parsed('latest', parsing.parse_latest_page)
+        
+        result = parse_latest_uploads(soup)
+        index_result(result)
+        return result
         
-        # If no results found with article selector, try a broader approach
-        if not results:
-            # Look for any links that might be content
-            links = soup.find_all('a', href=re.compile(r'/((?!page)[\w\-])+/'))
-            for link in links:
+    except Exception as e:
+        return {"error": f"Failed to get latest uploads: {str(e)}"}
+
+def parse_latest_uploads(soup):
+    """
+    Build the latest uploads API result from the parsed home page
+    """
+    # Find the "Upload Terbaru" section
+    latest_items = []
+    
+    # Look for content items under the "Upload Terbaru" heading
+    homemodule_title = soup.find('h3', class_='homemodule-title', string='Upload Terbaru')
+    if homemodule_title:
+        # Find the container with latest uploads (usually the next sibling or in the main content area)
+        grid_container = soup.find('div', id='gmr-main-load')
+        if grid_container:
+            articles = grid_container.find_all('article', class_='item-infinite')
+    
+            for article in articles[:20]:  # Get first 20 latest items
                 try:
-                    href = link.get('href')
-                    text = link.get_text().strip()
-                    
-                    # Skip navigation and utility links
-                    if any(skip_word in text.lower() for skip_word in ['page', 'next', 'prev', 'berikut', 'sebelum']):
-                        continue
-                        
-                    # Only include links that look like content
-                    if href and ('/tv/' in href or '/eps/' in href or re.match(r'^https?://[^/]+/[\w\-]+/$', href)):
-                        # Make absolute URL
-                        if href.startswith('/'):
-                            href = urljoin("https://new17.ngefilm.site", href)
-                        elif not href.startswith('http'):
-                            href = urljoin("https://new17.ngefilm.site", href)
-                        
-                        # Only add if it's not already in results
-                        if href not in [r['url'] for r in results]:
-                            results.append({
-                                'title': text or "Untitled",
-                                'url': href,
-                                'image_url': '',
-                                'rating': '',
-                                'type': 'Series' if '/tv/' in href else 'Movie'
-                            })
-                            
+                    # Extract title
+                    title_element = article.find('h2', class_='entry-title')
+                    title = ""
+                    if title_element:
+                        title_link = title_element.find('a')
+                        if title_link:
+                            title = title_link.get_text().strip()
+    
+                    # Extract URL
+                    url = ""
+                    if title_element:
+                        title_link = title_element.find('a', href=True)
+                        if title_link:
+                            url = title_link.get('href')
+    
+                    # Extract image
+                    image_url = ""
+                    img_element = article.find('img')
+                    if img_element:
+                        image_url = img_element.get('data-src') or img_element.get('src')
+    
+                    # Extract rating
+                    rating = ""
+                    rating_element = article.find(class_='gmr-rating-item')
+                    if rating_element:
+                        rating_text = rating_element.get_text().strip()
+                        # Extract numeric rating if possible
+                        rating_match = re.search(r'(\d+\.?\d*)', rating_text)
+                        if rating_match:
+                            rating = rating_match.group(1)
+    
+                    # Extract year from title or date
+                    year = ""
+                    # Try to find year in the title
+                    year_match = re.search(r'(?:\(|-|,)\s*(20\d{2}|19\d{2})\s*[\)\]-]?', title)
+                    if year_match:
+                        year = year_match.group(1)
+                    else:
+                        # Try to find year in dateCreated element
+                        date_element = article.find('time', class_='screen-reader-text')
+                        if date_element and date_element.get('datetime'):
+                            year = date_element.get('datetime')[:4]
+    
+                    # Determine if it's a series or movie
+                    type_indicator = "Movie"
+                    if any(keyword in title.lower() for keyword in ['season', 'episode', 'eps', 'series']):
+                        type_indicator = "Series"
+                    elif '/tv/' in url or '/series/' in url:
+                        type_indicator = "Series"
+    
+                    if title and url:
+                        latest_items.append({
+                            'title': title,
+                            'url': url,
+                            'image_url': image_url,
+                            'rating': rating,
+                            'year': year,
+                            'type': type_indicator
+                        })
                 except Exception as e:
+                    print(f"Error processing latest upload item: {e}")
                     continue
+    
+    return {
+        'section_title': 'Upload Terbaru',
+        'items': latest_items,
+        'total_items': len(latest_items)
+    }
+
+def _fetch_iframe_url(player_url, pages):
+    """
+    Fetch a player page and return (iframe_url, error)
+    """
+    try:
+        page = pages.get(player_url)
         
-        return {
-            'query': query,
-            'results': results,
-            'total_results': len(results)
-        }
+        # Look for iframe with data-litespeed-src or src
+        iframe_url = page.parsed('iframe', parsing.extract_iframe_url)
+        
+        return iframe_url, None
         
     except Exception as e:
-        return {"error": f"Search failed: {str(e)}"}
+        return "", str(e)
 
-def get_latest_uploads():
+def player_entry(server_name, player_url, iframe_url, error=None):
     """
-    Get latest uploads from the main page
+    Build the player dict returned by the API
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    player = {
+        'server_name': server_name,
+        'player_page_url': player_url,
+        'iframe_url': iframe_url or "",
+        'type': 'Stream'
     }
+    if error:
+        player['error'] = error
+    return player
+
+def _episode_link(series_url, link):
+    """
+    Return (title, absolute_url) when an <a> element links to an episode
+    """
+    href = link.get('href')
+    text = link.get_text().strip()
     
-    try:
-        # Get the main page
-        response = requests.get("https://new18.ngefilm.site/", headers=headers, timeout=30)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find the "Upload Terbaru" section
-        latest_items = []
-        
-        # Look for content items under the "Upload Terbaru" heading
-        homemodule_title = soup.find('h3', class_='homemodule-title', string='Upload Terbaru')
-        if homemodule_title:
-            # Find the container with latest uploads (usually the next sibling or in the main content area)
-            grid_container = soup.find('div', id='gmr-main-load')
-            if grid_container:
-                articles = grid_container.find_all('article', class_='item-infinite')
-                
-                for article in articles[:20]:  # Get first 20 latest items
-                    try:
-                        # Extract title
-                        title_element = article.find('h2', class_='entry-title')
-                        title = ""
-                        if title_element:
-                            title_link = title_element.find('a')
-                            if title_link:
-                                title = title_link.get_text().strip()
-                        
-                        # Extract URL
-                        url = ""
-                        if title_element:
-                            title_link = title_element.find('a', href=True)
-                            if title_link:
-                                url = title_link.get('href')
-                        
-                        # Extract image
-                        image_url = ""
-                        img_element = article.find('img')
-                        if img_element:
-                            image_url = img_element.get('data-src') or img_element.get('src')
-                        
-                        # Extract rating
-                        rating = ""
-                        rating_element = article.find(class_='gmr-rating-item')
-                        if rating_element:
-                            rating_text = rating_element.get_text().strip()
-                            # Extract numeric rating if possible
-                            rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                            if rating_match:
-                                rating = rating_match.group(1)
-                        
-                        # Extract year from title or date
-                        year = ""
-                        # Try to find year in the title
-                        year_match = re.search(r'(?:\(|-|,)\s*(20\d{2}|19\d{2})\s*[\)\]-]?', title)
-                        if year_match:
-                            year = year_match.group(1)
-                        else:
-                            # Try to find year in dateCreated element
-                            date_element = article.find('time', class_='screen-reader-text')
-                            if date_element and date_element.get('datetime'):
-                                year = date_element.get('datetime')[:4]
-                        
-                        # Determine if it's a series or movie
-                        type_indicator = "Movie"
-                        if any(keyword in title.lower() for keyword in ['season', 'episode', 'eps', 'series']):
-                            type_indicator = "Series"
-                        elif '/tv/' in url or '/series/' in url:
-                            type_indicator = "Series"
-                        
-                        if title and url:
-                            latest_items.append({
-                                'title': title,
-                                'url': url,
-                                'image_url': image_url,
-                                'rating': rating,
-                                'year': year,
-                                'type': type_indicator
-                            })
-                    except Exception as e:
-                        print(f"Error processing latest upload item: {e}")
-                        continue
-        
-        return {
-            'section_title': 'Upload Terbaru',
-            'items': latest_items,
-            'total_items': len(latest_items)
-        }
-        
-    except Exception as e:
-        return {"error": f"Failed to get latest uploads: {str(e)}"}
+    # Only include actual episode links
+    if '/eps/' in href and ('eps' in text.lower() or 'episode' in text.lower() or re.match(r'Eps\d+', text)):
+        # Make absolute URL if needed
+        if href.startswith('/'):
+            href = urljoin(series_url, href)
+        elif not href.startswith('http'):
+            href = urljoin(series_url, href)
+        return text, href
+    return None
 
-def extract_series_episodes(series_url, soup, headers, title):
+def iter_series_episodes(series_url, soup):
     """
-    Extract episode URLs and their player information from a series page
+    Yield every episode of a parsed series page as a {'title', 'url'} dict,
+    in page order and without duplicates
     """
+    seen_urls = set()
+    
     # Find episode links
     episode_elements = soup.find_all('div', class_='gmr-listseries')
-    episodes = []
-    
     if episode_elements:
-        episode_links = episode_elements[0].find_all('a', href=True)
-        for link in episode_links:
-            href = link.get('href')
+        for link in episode_elements[0].find_all('a', href=True):
             text = link.get_text().strip()
             
             # Skip the "Pilih Episode" link
             if 'pilih episode' in text.lower() or 'choose episode' in text.lower():
                 continue
-                
-            # Only include actual episode links
-            if '/eps/' in href and ('eps' in text.lower() or 'episode' in text.lower() or re.match(r'Eps\d+', text)):
-                # Make absolute URL if needed
-                if href.startswith('/'):
-                    href = urljoin(series_url, href)
-                elif not href.startswith('http'):
-                    href = urljoin(series_url, href)
-                
-                episodes.append({
-                    'title': text,
-                    'url': href
-                })
+            
+            episode = _episode_link(series_url, link)
+            if episode and episode[1] not in seen_urls:
+                seen_urls.add(episode[1])
+                yield {'title': episode[0], 'url': episode[1]}
     
     # If we didn't find episodes in gmr-listseries, look for them elsewhere
-    if not episodes:
-        # Look for episode links more broadly
-        all_links = soup.find_all('a', href=True)
-        for link in all_links:
-            href = link.get('href')
-            text = link.get_text().strip()
-            
-            if '/eps/' in href and ('eps' in text.lower() or 'episode' in text.lower() or re.match(r'Eps\d+', text)):
-                # Make absolute URL
-                if href.startswith('/'):
-                    href = urljoin(series_url, href)
-                elif not href.startswith('http'):
-                    href = urljoin(series_url, href)
-                
-                # Avoid duplicates
-                if href not in [e['url'] for e in episodes]:
-                    episodes.append({
-                        'title': text,
-                        'url': href
-                    })
-    
-    # Limit to first 20 episodes for performance
-    episodes = episodes[:20]
-    
-    # Extract player URLs for first few episodes
-    episode_data = []
-    
-    for episode in episodes[:8]:  # Process first 8 episodes fully
-        try:
-            episode_response = requests.get(episode['url'], headers=headers, timeout=30)
-            episode_response.raise_for_status()
-            episode_soup = BeautifulSoup(episode_response.content, 'html.parser')
-            
-            # Extract player URLs for this episode (Server 1 through Server 6)
-            players = []
-            for i in range(1, 7):
-                if i == 1:
-                    player_url = episode['url']  # Server 1 is the main episode page
-                else:
-                    if '?' in episode['url']:
-                        player_url = f"{episode['url']}&player={i}"
-                    else:
-                        player_url = f"{episode['url']}?player={i}"
-                
-                # Extract iframe URL from player page
-                try:
-                    player_page_response = requests.get(player_url, headers=headers, timeout=30)
-                    player_page_response.raise_for_status()
-                    player_page_soup = BeautifulSoup(player_page_response.content, 'html.parser')
-                    
-                    # Look for iframe with data-litespeed-src or src
-                    iframe = player_page_soup.find('iframe')
-                    iframe_url = ""
-                    if iframe:
-                        iframe_url = iframe.get('data-litespeed-src') or iframe.get('src')
-                        if iframe_url == 'about:blank':
-                            iframe_url = ""
-                    
-                    players.append({
-                        'server_name': f"Server {i}",
-                        'player_page_url': player_url,
-                        'iframe_url': iframe_url or "",
-                        'type': 'Stream'
-                    })
-                    
-                    # Small delay to be respectful
-                    time.sleep(0.1)
-                    
-                except Exception as e:
-                    players.append({
-                        'server_name': f"Server {i}",
-                        'player_page_url': player_url,
-                        'iframe_url': "",
-                        'error': str(e),
-                        'type': 'Stream'
-                    })
-            
-            episode_data.append({
-                'title': episode['title'],
-                'url': episode['url'],
-                'players': players
-            })
-            
-            # Small delay between episodes
-            time.sleep(0.2)
-            
-        except Exception as e:
-            episode_data.append({
+    if not seen_urls:
+        for link in soup.find_all('a', href=True):
+            episode = _episode_link(series_url, link)
+            if episode and episode[1] not in seen_urls:
+                seen_urls.add(episode[1])
+                yield {'title': episode[0], 'url': episode[1]}
+
+def parse_episode_cursor(cursor):
+    """
+    Turn an episode page cursor into an offset, raises ValueError when invalid
+    """
+    if cursor in (None, ''):
+        return 0
+    offset = int(cursor)
+    if offset < 0:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+def episode_page_limit(limit=None):
+    """
+    Clamp an episode page size to 1..SERIES_EPISODE_MAX_PAGE_SIZE, None
+    meaning SERIES_EPISODE_PAGE_SIZE
+    """
+    if limit is None:
+        return SERIES_EPISODE_PAGE_SIZE
+    return max(1, min(limit, SERIES_EPISODE_MAX_PAGE_SIZE))
+
+def extract_series_episodes(series_url, soup, title, cursor=None, limit=None):
+    """
+    Build one page of a series' episode list. cursor is the next_cursor of
+    the previous page (None for the first page) and limit defaults to
+    SERIES_EPISODE_PAGE_SIZE. The episode links are streamed through, so only
+    the requested window is kept however long the series is.
+    """
+    offset = parse_episode_cursor(cursor)
+    limit = episode_page_limit(limit)
+    
+    window = []
+    total = 0
+    for index, episode in enumerate(iter_series_episodes(series_url, soup)):
+        total = index + 1
+        if offset <= index < offset + limit:
+            # Players are resolved per episode on demand through /api/extract-episode
+            window.append({
                 'title': episode['title'],
                 'url': episode['url'],
-                'error': str(e),
-                'players': []
+                'players': []  # Will be populated when user selects this episode
             })
     
-    # For remaining episodes, just include basic info
-    for episode in episodes[8:]:
-        episode_data.append({
-            'title': episode['title'],
-            'url': episode['url'],
-            'players': []  # Will be populated when user selects this episode
-        })
-    
     return {
         'title': title,
         'url': series_url,
         'type': 'series',
-        'episodes': episode_data,
-        'total_episodes': len(episodes)
+        'episodes': window,
+        'total_episodes': total,
+        'cursor': str(offset),
+        'next_cursor': str(offset + limit) if offset + limit < total else None
     }
 
-def extract_movie_players(movie_url, soup, headers, title):
+def extract_episode_page(series_url, cursor=None, limit=None):
     """
-    Extract player URLs for a movie
+    Fetch a series page and extract one page of its episode list
+    """
+    pages = FetchContext()
+    
+    try:
+        soup, title, is_series = _fetch_content_page(series_url, pages)
+        return extract_series_episodes(series_url, soup, title, cursor, limit)
+        
+    except Exception as e:
+        return {"error": f"Failed to extract episodes: {str(e)}"}
+
+def episode_player_pages(episode_url):
+    """
+    List the player pages of an episode as (server_name, url) pairs
+    """
+    player_jobs = []
+    for i in range(1, 7):
+        if i == 1:
+            player_url = episode_url  # Server 1 is the main episode page
+        else:
+            if '?' in episode_url:
+                player_url = f"{episode_url}&player={i}"
+            else:
+                player_url = f"{episode_url}?player={i}"
+        player_jobs.append((f"Server {i}", player_url))
+    
+    return player_jobs
+
+def extract_episode_players(episode_url, budget=None):
+    """
+    Extract player URLs for a single episode (Server 1 through Server 6)
+    """
+    player_jobs = episode_player_pages(episode_url)
+    
+    pages = FetchContext(budget)
+    iframe_results = fetch_pool.map(_fetch_iframe_url, [job[1] for job in player_jobs], pages, admit=pages.admit)
+    players = [
+        player_entry(server_name, player_url, iframe_url, error)
+        for (server_name, player_url), (iframe_url, error) in zip(player_jobs, iframe_results)
+    ]
+    
+    return {
+        'url': episode_url,
+        'players': players
+    }
+
+def movie_player_pages(movie_url, soup):
+    """
+    List the player pages (server name and URL) of a movie page
     """
     # Find player tabs
     player_tabs = soup.find('ul', class_='muvipro-player-tabs')
@@ -458,41 +667,22 @@ def extract_movie_players(movie_url, soup, headers, title):
                 'player_page_url': player_url
             })
     
-    # Extract iframe URLs from each player page
-    all_players = []
+    return player_urls
+
+def extract_movie_players(movie_url, soup, title, pages):
+    """
+    Extract player URLs for a movie
+    """
+    player_urls = movie_player_pages(movie_url, soup)
     
-    for player_info in player_urls:
-        try:
-            player_response = requests.get(player_info['player_page_url'], headers=headers, timeout=30)
-            player_response.raise_for_status()
-            player_soup = BeautifulSoup(player_response.content, 'html.parser')
-            
-            # Look for iframe with data-litespeed-src or src
-            iframe = player_soup.find('iframe')
-            iframe_url = ""
-            if iframe:
-                iframe_url = iframe.get('data-litespeed-src') or iframe.get('src')
-                if iframe_url == 'about:blank':
-                    iframe_url = ""
-            
-            all_players.append({
-                'server_name': player_info['server_name'],
-                'player_page_url': player_info['player_page_url'],
-                'iframe_url': iframe_url or "",
-                'type': 'Stream'
-            })
-            
-            # Small delay to be respectful
-            time.sleep(0.2)
-            
-        except Exception as e:
-            all_players.append({
-                'server_name': player_info['server_name'],
-                'player_page_url': player_info['player_page_url'],
-                'iframe_url': '',
-                'error': str(e),
-                'type': 'Stream'
-            })
+    # Extract iframe URLs from all player pages concurrently
+    iframe_results = fetch_pool.map(
+        _fetch_iframe_url, [info['player_page_url'] for info in player_urls], pages, admit=pages.admit
+    )
+    all_players = [
+        player_entry(info['server_name'], info['player_page_url'], iframe_url, error)
+        for info, (iframe_url, error) in zip(player_urls, iframe_results)
+    ]
     
     return {
         'title': title,
@@ -501,41 +691,810 @@ def extract_movie_players(movie_url, soup, headers, title):
         'players': all_players
     }
 
+def index_result(result):
+    """
+    Feed the titles of a latest uploads, search or extraction result into the search index
+    """
+    if not SEARCH_INDEX_ENABLED or not result or 'error' in result:
+        return
+    
+    if 'items' in result:
+        search_index.add_many(result['items'])
+    elif 'results' in result:
+        search_index.add_many(result['results'])
+    elif result.get('url') and result.get('title') not in (None, '', 'Unknown Title'):
+        search_index.add({
+            'title': result['title'],
+            'url': result['url'],
+            'type': 'Series' if result.get('type') == 'series' else 'Movie'
+        })
+
+def search_local_index(query, content_type=None):
+    """
+    Answer a search from the local index, returns None on a miss
+    """
+    if not SEARCH_INDEX_ENABLED:
+        return None
+    
+    search_index.count('queries')
+    results = search_index.search(query, content_type)
+    # Typo matches are only guesses, they never stand in for an upstream search
+    matched = sum(1 for item in results if item['match'] != 'fuzzy')
+    if matched < SEARCH_INDEX_MIN_RESULTS and not search_index.query_resolved_upstream(query, content_type):
+        return None
+    
+    search_index.count('answered')
+    results = [{field: item.get(field, '') for field in SEARCH_RESULT_FIELDS} for item in results]
+    return {
+        'query': query,
+        'results': results,
+        'total_results': len(results),
+        'source': 'index'
+    }
+
+def record_upstream_search(query, content_type, result):
+    """
+    Merge the hits of an upstream search back into the index
+    """
+    result['source'] = 'upstream'
+    if not SEARCH_INDEX_ENABLED or 'error' in result:
+        return result
+    
+    search_index.count('upstream')
+    index_result(result)
+    search_index.record_upstream_query(query, content_type)
+    return result
+
+def search_flight_key(query, content_type=None):
+    """
+    Key under which identical upstream searches are coalesced
+    """
+    return f"search:{content_type or ''}:{' '.join(query.lower().split())}"
+
+def search_with_index(query, content_type=None):
+    """
+    Search the local index first and upstream only on a miss
+    """
+    result = search_local_index(query, content_type)
+    if result is not None:
+        return result
+    
+    return inflight.do(
+        search_flight_key(query, content_type),
+        lambda: record_upstream_search(query, content_type, search_movies_series(query, content_type))
+    )[0]
+
+if EXTRACT_CACHE_BACKEND == 'sqlite':
+    extract_cache_backend = SQLiteBackend(EXTRACT_CACHE_PATH, EXTRACT_CACHE_MAX_ENTRIES)
+else:
+    extract_cache_backend = MemoryBackend(EXTRACT_CACHE_MAX_ENTRIES)
+
+extract_cache = ResultCache(
+    extract_cache_backend,
+    ttl=EXTRACT_CACHE_TTL,
+    error_ttl=EXTRACT_CACHE_ERROR_TTL
+)
+
+# Identical extractions, searches and latest uploads loads running at the
+# same time share one computation. With the sqlite backend this holds across
+# worker processes, through a lock in the shared store
+inflight = SingleFlight(extract_cache_backend if EXTRACT_CACHE_BACKEND == 'sqlite' else None)
+
+def extract_once(key, extract, refresh=False):
+    """
+    Run extract() once for all concurrent callers of an extraction cache key
+    and cache the result. refresh=True extracts again even when a result is
+    cached
+    """
+    def compute():
+        # The previous flight may have finished since the caller's cache lookup
+        result = None if refresh else extract_cache.peek(key)
+        if result is None:
+            result = extract()
+            extract_cache.set(key, result)
+        return result
+    
+    return inflight.do(key, compute)[0]
+
+def load_latest_uploads():
+    """
+    Fetch the latest uploads once for all workers refreshing at the same time
+    """
+    return inflight.do('latest', get_latest_uploads)[0]
+
+latest_cache = StaleWhileRevalidateCache(
+    load_latest_uploads,
+    ttl=LATEST_CACHE_TTL,
+    max_stale=LATEST_CACHE_MAX_STALE,
+    cacheable=lambda result: 'error' not in result
+)
+
+def get_cached_latest_uploads():
+    """
+    Get latest uploads from the stale-while-revalidate cache
+    """
+    result, age, status = latest_cache.get()
+    result = dict(result)
+    result['cache_age'] = round(age, 3)
+    result['cache_status'] = status
+    return result
+
+def peek_cached_latest_uploads():
+    """
+    Get latest uploads only if they are cached, None otherwise
+    """
+    cached = latest_cache.peek()
+    if cached is None:
+        return None
+    
+    result, age, status = cached
+    result = dict(result)
+    result['cache_age'] = round(age, 3)
+    result['cache_status'] = status
+    return result
+
+def image_proxy_url(url):
+    """
+    Signed /img URL of an upstream image. Empty and non-http URLs are kept
+    """
+    if not IMAGE_PROXY_ENABLED or not url or not url.startswith(('http://', 'https://')):
+        return url
+    
+    # Posters on every mirror share one cache entry
+    url = mirror_pool.canonical_url(url)
+    return f"/img?url={quote(url, safe='')}&sig={image_cache.sign(url)}"
+
+def proxy_images(result):
+    """
+    Copy of a latest uploads or search result with its images served through /img
+    """
+    if not IMAGE_PROXY_ENABLED or 'error' in result:
+        return result
+    
+    result = dict(result)
+    for field in ('items', 'results'):
+        if field in result:
+            result[field] = [dict(item, image_url=image_proxy_url(item.get('image_url'))) for item in result[field]]
+    return result
+
+def fetch_image(url):
+    """
+    Fetch an image from upstream into the image cache. Posters go out at
+    background priority so page extractions never queue behind them, and
+    the download stops as soon as it passes IMAGE_MAX_BYTES.
+    """
+    with priority('background'):
+        response = mirrors.get(url, stream=True)
+    with response:
+        response.raise_for_status()
+        
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type.startswith('image/'):
+            raise ValueError(f"Not an image: {content_type or 'no content type'}")
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > IMAGE_MAX_BYTES:
+            raise ValueError(f"Image larger than {IMAGE_MAX_BYTES} bytes")
+        
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            content.extend(chunk)
+            if len(content) > IMAGE_MAX_BYTES:
+                raise ValueError(f"Image larger than {IMAGE_MAX_BYTES} bytes")
+    
+    image_cache.put(url, bytes(content), content_type)
+
+def get_cached_image(url):
+    """
+    Open a cached image, fetching it once for all concurrent requests on a
+    miss. Returns (image, cache_hit)
+    """
+    image = image_cache.get(url)
+    if image is not None:
+        return image, True
+    
+    def fetch():
+        # The previous flight may have stored it since our lookup
+        if not image_cache.contains(url):
+            fetch_image(url)
+        # Waiters in other workers only need to know it is on disk now
+        return {'url': url}
+    
+    inflight.do('img:' + url, fetch)
+    image = image_cache.get(url, count=False)
+    if image is None:
+        raise ValueError("Image was evicted before it could be served")
+    return image, False
+
+def get_cached_player_urls(url, budget=None):
+    """
+    Extract player URLs through the extraction cache, returns (result, cache_hit)
+    """
+    key = normalize_url(url)
+    result = extract_cache.get(key)
+    if result is not None:
+        return result, True
+    
+    return extract_once(key, lambda: extract_player_urls(url, budget)), False
+
+def extract_batch_item(url):
+    """
+    Extract one batch title, behind interactive requests in the outbound queue
+    """
+    with priority('batch'):
+        return get_cached_player_urls(url, batch_budget)
+
+def extract_batch(urls):
+    """
+    Extract many titles at once. Duplicate URLs (after mirror and URL
+    normalization) are extracted once, cached titles are answered straight
+    away and the rest run on the shared batch pool under the batch rate
+    budget. Yields (requested_urls, result, cache_hit) as each title completes.
+    """
+    requested = {}
+    for url in urls:
+        canonical = mirror_pool.canonical_url(url)
+        requested.setdefault(normalize_url(canonical), (canonical, []))[1].append(url)
+    
+    cached = []
+    futures = {}
+    for key, (canonical, originals) in requested.items():
+        result = extract_cache.get(key)
+        if result is not None:
+            cached.append((originals, result, True))
+        else:
+            future = batch_executor.submit(metrics.run_in_context(extract_batch_item, canonical))
+            futures[future] = originals
+    
+    # Every miss is already scheduled before the first result goes out
+    yield from cached
+    for future in as_completed(futures):
+        result, cache_hit = future.result()
+        yield futures[future], result, cache_hit
+
+def stream_cached_player_urls(url):
+    """
+    Stream extraction events, replaying a cached result when there is one
+    and the result of an identical extraction that is already running
+    """
+    key = normalize_url(url)
+    result = extract_cache.get(key)
+    while result is None:
+        # Join an identical extraction already running, or lead one
+        future, leader = inflight.begin(key)
+        if not leader:
+            try:
+                result = future.result()
+            except FlightAbandoned:
+                continue
+            break
+        
+        result = extract_cache.peek(key)
+        if result is not None:
+            inflight.finish(key, result)
+            break
+        try:
+            for event in stream_player_urls(url):
+                if event['event'] == 'done':
+                    result = event['result']
+                    extract_cache.set(key, result)
+                    inflight.finish(key, result)
+                yield event
+        finally:
+            if result is None:
+                inflight.finish(key, error=FlightAbandoned(key))
+        return
+    
+    yield from replay_result(result)
+
+def replay_result(result):
+    """
+    Stream events for an extraction result that is already complete
+    """
+    if 'error' in result:
+        yield {'event': 'error', 'error': result['error']}
+    else:
+        meta = {key: value for key, value in result.items() if key != 'players'}
+        if 'players' in result:
+            meta['players'] = [
+                {'server_name': player['server_name'], 'player_page_url': player['player_page_url']}
+                for player in result['players']
+            ]
+        yield {'event': 'meta', **meta}
+        for index, player in enumerate(result.get('players', [])):
+            yield {'event': 'player', 'index': index, 'player': player}
+    yield {'event': 'done', 'result': result}
+
+def get_cached_episode_players(episode_url):
+    """
+    Extract episode players through the extraction cache, returns (result, cache_hit)
+    """
+    key = 'episode:' + normalize_url(episode_url)
+    result = extract_cache.get(key)
+    if result is not None:
+        return result, True
+    
+    return extract_once(key, lambda: extract_episode_players(episode_url)), False
+
+def episode_page_key(series_url, offset, limit):
+    return f"episodes:{normalize_url(series_url)}:{offset}:{limit}"
+
+def get_cached_episode_page(series_url, cursor=None, limit=None):
+    """
+    Extract one page of a series' episode list through the extraction cache,
+    returns (result, cache_hit)
+    """
+    # The key has to name the page that is actually extracted
+    limit = episode_page_limit(limit)
+    key = episode_page_key(series_url, parse_episode_cursor(cursor), limit)
+    result = extract_cache.get(key)
+    if result is not None:
+        return result, True
+    
+    return extract_once(key, lambda: extract_episode_page(series_url, cursor, limit)), False
+
+def resolve_episode_window(result, count):
+    """
+    Return a copy of an episode page with the players of its first count
+    episodes resolved concurrently on the episode pool
+    """
+    episodes = [dict(episode) for episode in result['episodes']]
+    window = episodes[:count]
+    futures = [
+        episode_executor.submit(metrics.run_in_context(get_cached_episode_players, episode['url']))
+        for episode in window
+    ]
+    for episode, future in zip(window, futures):
+        episode['players'] = future.result()[0]['players']
+    return dict(result, episodes=episodes)
+
+def _cached_episode_window(series_url, offset):
+    """
+    The cached page of a series' episode list starting at offset, as the
+    page loads it (the series extraction for the first page, then
+    /api/series/episodes pages of the default size). None when not cached
+    """
+    if offset == 0:
+        series = extract_cache.peek(normalize_url(series_url))
+        if series and 'episodes' in series:
+            return series
+    return extract_cache.peek(episode_page_key(series_url, offset, SERIES_EPISODE_PAGE_SIZE))
+
+def _next_episode_urls(series_url, episode_url, count):
+    """
+    Find the episodes following episode_url in the cached pages of a series'
+    episode list. When they continue on a page that is not cached yet, that
+    page is extracted, so this may reach upstream
+    """
+    key = normalize_url(episode_url)
+    following = None
+    offset = 0
+    while offset is not None:
+        if following is None:
+            window = _cached_episode_window(series_url, offset)
+            if window is None:
+                return []
+        else:
+            window = get_cached_episode_page(series_url, str(offset))[0]
+            if 'error' in window:
+                break
+        
+        for episode in window.get('episodes', []):
+            if following is not None:
+                following.append(episode['url'])
+            elif normalize_url(episode['url']) == key:
+                following = []
+        if following is not None and len(following) >= count:
+            break
+        
+        next_cursor = window.get('next_cursor')
+        offset = None if next_cursor is None else parse_episode_cursor(next_cursor)
+    
+    return (following or [])[:count]
+
+def prefetch_following_episodes(series_url, episode_url):
+    """
+    Warm the cache for the episodes after episode_url in the background
+    """
+    prefetch_executor.submit(metrics.run_in_context(_prefetch_following, series_url, episode_url))
+
+def _prefetch_following(series_url, episode_url):
+    try:
+        with priority('background'):
+            episode_urls = _next_episode_urls(series_url, episode_url, EPISODE_PREFETCH_COUNT)
+        prefetch_episode_players(episode_urls)
+    except Exception as e:
+        print(f"Error finding episodes after {episode_url}: {e}")
+
+def prefetch_episode_players(episode_urls):
+    """
+    Speculatively extract episodes in the background so they are cache hits later
+    """
+    for episode_url in episode_urls:
+        key = 'episode:' + normalize_url(episode_url)
+        with _prefetch_lock:
+            if key in _prefetching:
+                continue
+            _prefetching.add(key)
+        prefetch_executor.submit(_prefetch_episode, episode_url, key)
+
+def _prefetch_episode(episode_url, key):
+    try:
+        if extract_cache.peek(key) is None:
+            with priority('background'):
+                extract_once(key, lambda: extract_episode_players(episode_url))
+    except Exception as e:
+        print(f"Error prefetching episode {episode_url}: {e}")
+    finally:
+        with _prefetch_lock:
+            _prefetching.discard(key)
+
+def _is_warm(item):
+    return extract_cache.peek(normalize_url(item['url'])) is not None
+
+def warm_latest_item(item, budget, changed):
+    """
+    Pre-extract a latest upload into the extraction cache. For series the
+    first episode's players are warmed as well. Only changed items are
+    extracted again when cached, and an extraction of the same title that is
+    already running (a user request, another worker) is joined
+    """
+    with priority('background'):
+        url = item['url']
+        result = extract_once(normalize_url(url), lambda: extract_player_urls(url, budget), refresh=changed)
+        
+        if result.get('type') == 'series' and result.get('episodes'):
+            episode_url = result['episodes'][0]['url']
+            key = 'episode:' + normalize_url(episode_url)
+            extract_once(key, lambda: extract_episode_players(episode_url, budget), refresh=changed)
+    
+    return result
+
+# Identifies this worker's claims on warmer runs in the shared store
+_warmer_owner = uuid.uuid4().hex
+
+def claim_warmer_run():
+    """
+    With the sqlite backend, let only one of the workers sharing it warm per
+    WARMER_INTERVAL. The claim is never released, it expires with the interval
+    """
+    if EXTRACT_CACHE_BACKEND != 'sqlite':
+        return True
+    return extract_cache_backend.lock('warmer:run', _warmer_owner, WARMER_INTERVAL * WARMER_CLAIM_SHARE)
+
+warmer = Warmer(
+    list_items=lambda: latest_cache.get()[0],
+    is_cached=_is_warm,
+    warm_item=warm_latest_item,
+    interval=WARMER_INTERVAL,
+    budget=TokenBucket(WARMER_RATE, WARMER_BURST),
+    claim_run=claim_warmer_run
+)
+
+def collect_cache_metrics():
+    """
+    Report cache and connection pool counters to /metrics
+    """
+    latest = latest_cache.stats()
+    extract = extract_cache.stats()
+    pages = page_store.stats()
+    search = search_index.stats()
+    pool = http_client.pool_stats()
+    flights = inflight.stats()
+    images = image_cache.stats()
+    
+    # (hits, misses) per cache, a revalidated page counts as a hit
+    lookups = {
+        'latest': (latest['fresh'] + latest['stale'], latest['miss']),
+        'extract': (extract['hits'], extract['misses']),
+        'pages': (pages['not_modified'], pages['fetches'] - pages['not_modified']),
+        'search_index': (search['answered'], search['queries'] - search['answered']),
+        'images': (images['hits'], images['misses']),
+    }
+    return [
+        (
+            'scraper_cache_lookups_total', 'counter', 'Cache lookups by result',
+            [({'cache': cache, 'result': 'hit'}, hits) for cache, (hits, misses) in lookups.items()]
+            + [({'cache': cache, 'result': 'miss'}, misses) for cache, (hits, misses) in lookups.items()]
+        ),
+        (
+            'scraper_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits',
+            [
+                ({'cache': cache}, round(hits / (hits + misses), 4) if hits + misses else None)
+                for cache, (hits, misses) in lookups.items()
+            ]
+        ),
+        (
+            'scraper_cache_entries', 'gauge', 'Entries held per cache',
+            [
+                ({'cache': 'extract'}, extract['entries']),
+                ({'cache': 'pages'}, pages['entries']),
+                ({'cache': 'search_index'}, search['documents']),
+            ]
+        ),
+        (
+            'scraper_image_cache_bytes', 'gauge', 'Bytes of posters held in the on-disk image cache',
+            [({}, images['bytes'])]
+        ),
+        (
+            'scraper_coalesced_requests_total', 'counter', 'Requests answered by an identical in-flight computation',
+            [({'scope': 'worker'}, flights['coalesced']), ({'scope': 'shared_store'}, flights['remote_results'])]
+        ),
+        (
+            'scraper_upstream_requests_total', 'counter', 'Requests sent through the pooled HTTP client',
+            [({}, pool['requests'])]
+        ),
+        (
+            'scraper_upstream_connections_opened_total', 'counter', 'Upstream connections opened',
+            [({}, pool['connections_opened'])]
+        ),
+    ]
+
+metrics.registry.register_collector(collect_cache_metrics)
+
+def collect_mirror_metrics():
+    """
+    Report mirror health to /metrics
+    """
+    mirrors = mirror_pool.stats()['mirrors']
+    return [
+        (
+            'scraper_mirror_up', 'gauge', 'Whether the mirror circuit breaker is closed',
+            [({'host': mirror['host']}, 1 if mirror['state'] == 'closed' else 0) for mirror in mirrors]
+        ),
+        (
+            'scraper_mirror_hedged_requests_total', 'counter', 'Hedged requests sent to the mirror',
+            [({'host': mirror['host']}, mirror['hedges']) for mirror in mirrors]
+        ),
+    ]
+
+metrics.registry.register_collector(collect_mirror_metrics)
+
+def collect_scheduler_metrics():
+    """
+    Report outbound queue depths to /metrics
+    """
+    return [
+        (
+            'scraper_scheduler_queue_depth', 'gauge', 'Upstream requests waiting for the outbound scheduler',
+            [({'host': host, 'priority': name}, depth) for (host, name), depth in scheduler.queue_depths().items()]
+        ),
+    ]
+
+metrics.registry.register_collector(collect_scheduler_metrics)
+
+@app.before_request
+def start_request_timings():
+    g.timings = metrics.start_timings()
+
+@app.after_request
+def add_server_timing(response):
+    timings = g.get('timings')
+    if timings is None:
+        return response
+    
+    # Streamed responses only cover the work done before the first byte
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.api_request_seconds.observe(timings.elapsed(), endpoint=endpoint)
+    metrics.api_responses.inc(endpoint=endpoint, status=response.status_code)
+    response.headers['Server-Timing'] = timings.server_timing()
+    return response
+
+@app.teardown_request
+def finish_request_timings(exc):
+    metrics.finish_timings()
+
+@app.after_request
+def cache_api_response(response):
+    # Registered after add_server_timing so it runs first and 304s are counted
+    if response.mimetype != 'application/json' or response.direct_passthrough or response.is_streamed:
+        return response
+    
+    status, body = http_cache.finalize(
+        request.method, request.path, response.status_code, response.headers, response.get_data(),
+        request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+    )
+    response.status_code = status
+    response.set_data(body)
+    return response
+
+def request_data():
+    """
+    Parameters of an API call: the JSON body of a POST, the query string of a GET
+    """
+    if request.method == 'GET':
+        return request.args
+    return request.get_json(silent=True) or {}
+
+def latest_etag(result):
+    """
+    ETag of a latest uploads result that ignores its cache age, so it only
+    changes with the uploads themselves
+    """
+    stable = {key: value for key, value in result.items() if key not in ('cache_age', 'cache_status')}
+    return http_cache.etag(json.dumps(stable, sort_keys=True).encode())
+
+def asset_url(name):
+    """
+    URL of a static asset, its fingerprinted build when there is one
+    """
+    return url_for('static', filename=asset_manifest.get(name, name))
+
+app.jinja_env.globals['asset_url'] = asset_url
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    # Inline the cached latest uploads so the first paint needs no API call.
+    # Nothing is fetched here, the page loads them itself on a cold cache
+    latest = peek_cached_latest_uploads()
+    if latest is not None:
+        latest = proxy_images(latest)
+    return render_template('index.html', latest=latest)
 
-@app.route('/api/extract', methods=['POST'])
+@app.route('/api/extract', methods=['GET', 'POST'])
 def extract_api():
     try:
-        data = request.get_json()
+        data = request_data()
         url = data.get('url')
         
         if not url:
             return jsonify({"error": "URL is required"}), 400
         
         # Extract player URLs
-        result = extract_player_urls(url)
+        result, cache_hit = get_cached_player_urls(mirror_pool.canonical_url(url))
         
-        return jsonify(result)
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        if has_errors(result):
+            response.headers['Cache-Control'] = http_cache.NO_CACHE
+        return response
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
-@app.route('/api/search', methods=['POST'])
-def search_api():
+@app.route('/api/extract/stream', methods=['POST'])
+def extract_stream_api():
+    data = request.get_json(silent=True) or {}
+    url = data.get('url')
+    
+    if not url:
+        return jsonify({"error": "URL is required"}), 400
+    
+    def generate():
+        try:
+            for event in stream_cached_player_urls(mirror_pool.canonical_url(url)):
+                yield json.dumps(event) + '\n'
+        except Exception as e:
+            yield json.dumps({'event': 'error', 'error': f"Server error: {str(e)}"}) + '\n'
+    
+    # Newline-delimited JSON, one event per line
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/extract/batch', methods=['POST'])
+def extract_batch_api():
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    
+    if not isinstance(urls, list) or not urls or not all(isinstance(url, str) and url for url in urls):
+        return jsonify({"error": "urls must be a non-empty list of URLs"}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({"error": f"At most {BATCH_MAX_URLS} URLs per batch"}), 400
+    
+    if data.get('stream'):
+        def generate():
+            try:
+                for originals, result, cache_hit in extract_batch(urls):
+                    for url in originals:
+                        yield json.dumps({
+                            'event': 'result',
+                            'url': url,
+                            'cache': 'HIT' if cache_hit else 'MISS',
+                            'result': result
+                        }) + '\n'
+                yield json.dumps({'event': 'done'}) + '\n'
+            except Exception as e:
+                yield json.dumps({'event': 'error', 'error': f"Server error: {str(e)}"}) + '\n'
+        
+        # Newline-delimited JSON, one event per title as it completes
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    
+    try:
+        started = time.monotonic()
+        results = {}
+        cache_hits = 0
+        for originals, result, cache_hit in extract_batch(urls):
+            cache_hits += cache_hit * len(originals)
+            for url in originals:
+                results[url] = result
+        
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'cache_hits': cache_hits,
+            'elapsed': round(time.monotonic() - started, 3)
+        })
+        
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/series/episodes', methods=['POST'])
+def series_episodes_api():
+    try:
+        data = request.get_json(silent=True) or {}
+        url = data.get('url')
+        cursor = data.get('cursor')
+        limit = data.get('limit')
+        
+        if not url:
+            return jsonify({"error": "URL is required"}), 400
+        try:
+            parse_episode_cursor(cursor)
+            limit = episode_page_limit(None if limit is None else int(limit))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid cursor or limit"}), 400
+        
+        # One page of the full episode list, players on request only
+        result, cache_hit = get_cached_episode_page(mirror_pool.canonical_url(url), cursor, limit)
+        if data.get('resolve_players') and 'error' not in result:
+            result = resolve_episode_window(result, SERIES_RESOLVE_MAX)
+        
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
+        
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/extract-episode', methods=['POST'])
+def extract_episode_api():
     try:
         data = request.get_json()
+        url = data.get('url')
+        series_url = data.get('series_url')
+        
+        if not url:
+            return jsonify({"error": "URL is required"}), 400
+        
+        # Results and cache keys always use the canonical mirror
+        url = mirror_pool.canonical_url(url)
+        
+        # Extract players for this episode only
+        result, cache_hit = get_cached_episode_players(url)
+        
+        # Warm the cache for the episodes the user is likely to open next
+        if series_url and EPISODE_PREFETCH_COUNT > 0:
+            prefetch_following_episodes(mirror_pool.canonical_url(series_url), url)
+        
+        response = jsonify(result['players'])
+        response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+        return response
+        
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+@app.route('/api/search', methods=['GET', 'POST'])
+def search_api():
+    try:
+        data = request_data()
         query = data.get('query')
         content_type = data.get('type', None)  # 'movie', 'tv', or None for both
         
         if not query:
             return jsonify({"error": "Query is required"}), 400
         
-        # Perform search
-        result = search_movies_series(query, content_type)
+        # Perform search (from the local index unless it misses)
+        result = search_with_index(query, content_type)
         
-        return jsonify(result)
+        response = jsonify(proxy_images(result))
+        if 'error' in result:
+            # An upstream failure must not be cached by browsers and CDNs
+            response.headers['Cache-Control'] = http_cache.NO_CACHE
+        return response
         
     except Exception as e:
         return jsonify({"error": f"Search error: {str(e)}"}), 500
@@ -543,13 +1502,66 @@ def search_api():
 @app.route('/api/latest', methods=['GET'])
 def latest_api():
     try:
-        # Get latest uploads
-        result = get_latest_uploads()
+        # Get latest uploads (from memory unless nothing is cached yet)
+        result = proxy_images(get_cached_latest_uploads())
         
-        return jsonify(result)
+        response = jsonify(result)
+        response.headers['ETag'] = latest_etag(result)
+        if 'error' in result:
+            response.headers['Cache-Control'] = http_cache.NO_CACHE
+        return response
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+@app.route('/img', methods=['GET'])
+def image_api():
+    url = request.args.get('url', '')
+    if not image_cache.verify(url, request.args.get('sig')):
+        return jsonify({"error": "Invalid image signature"}), 403
+    
+    try:
+        image, cache_hit = get_cached_image(url)
+    except Exception as e:
+        return jsonify({"error": f"Image error: {str(e)}"}), 502
+    
+    # The proxy URL names one upstream image, so it never changes
+    response = send_file(
+        image.file,
+        mimetype=image.content_type,
+        etag=image.etag.strip('"'),
+        last_modified=image.fetched_at,
+        max_age=IMAGE_MAX_AGE,
+        conditional=True
+    )
+    response.headers['Cache-Control'] = f'public, max-age={IMAGE_MAX_AGE}, immutable'
+    response.headers['X-Cache'] = 'HIT' if cache_hit else 'MISS'
+    return response
+
+@app.route('/api/stats', methods=['GET'])
+def stats_api():
+    return jsonify({
+        'http_pool': http_client.pool_stats(),
+        'pages': page_store.stats(),
+        'latest_cache': latest_cache.stats(),
+        'extract_cache': extract_cache.stats(),
+        'search_index': search_index.stats(),
+        'mirrors': mirror_pool.stats(),
+        'singleflight': inflight.stats(),
+        'scheduler': scheduler.stats(),
+        'images': image_cache.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_api():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/warmer', methods=['GET'])
+def warmer_api():
+    return jsonify(warmer.status())
+
+if WARMER_ENABLED:
+    warmer.start()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
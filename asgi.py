@@ -0,0 +1,250 @@
+"""
+ASGI entry point.
+
+    uvicorn asgi:app --workers 2
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+
+With SCRAPER_ENGINE=async (the default here) the scraper API endpoints are
+served natively by the asyncio engine, so one process can keep hundreds of
+extractions waiting on upstream at once. Every other route (the page, static
+files, stats) and every route with SCRAPER_ENGINE=sync goes to the Flask app.
+
+Requires the packages from requirements-async.txt.
+"""
+import asyncio
+import json
+import os
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_module
+import http_cache
+import metrics
+from async_scraper import AsyncScraper
+from cache import normalize_url, has_errors
+from mirrors import mirror_pool
+from scheduler import priority
+
+SCRAPER_ENGINE = os.environ.get('SCRAPER_ENGINE', 'async')
+
+flask_app = WsgiToAsgi(flask_module.app)
+engine = AsyncScraper()
+
+# Episodes being prefetched in the background, keyed like the extraction cache
+_prefetching = set()
+
+
+async def _read_json(receive):
+    body = b''
+    more_body = True
+    while more_body:
+        message = await receive()
+        body += message.get('body', b'')
+        more_body = message.get('more_body', False)
+    try:
+        return json.loads(body or b'{}')
+    except ValueError:
+        return {}
+
+
+def _read_query(scope):
+    return {key: values[-1] for key, values in parse_qs(scope['query_string'].decode('latin-1')).items()}
+
+
+def _request_header(scope, name):
+    name = name.lower().encode()
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_json(send, scope, payload, status=200, headers=None):
+    body = json.dumps(payload, sort_keys=True).encode('utf-8')
+    headers = dict(headers or {})
+    status, body = http_cache.finalize(
+        scope['method'], scope['path'], status, headers, body,
+        _request_header(scope, 'If-None-Match'), _request_header(scope, 'Accept-Encoding')
+    )
+    response_headers = [(b'access-control-allow-origin', b'*')]
+    if status != 304:
+        response_headers += [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]
+    for name, value in headers.items():
+        response_headers.append((name.lower().encode(), value.encode()))
+    await send({'type': 'http.response.start', 'status': status, 'headers': response_headers})
+    await send({'type': 'http.response.body', 'body': body})
+    return status
+
+
+async def _extract_once(key, extract):
+    """
+    Run extract() once for all concurrent requests of an extraction cache
+    key (in every worker with the sqlite backend) and cache the result
+    """
+    async def compute():
+        result = flask_module.extract_cache.peek(key)
+        if result is None:
+            result = await extract()
+            flask_module.extract_cache.set(key, result)
+        return result
+
+    return (await flask_module.inflight.do_async(key, compute))[0]
+
+
+async def extract_api(data):
+    url = data.get('url')
+    if not url:
+        return {"error": "URL is required"}, 400, None
+
+    url = mirror_pool.canonical_url(url)
+    key = normalize_url(url)
+    result = flask_module.extract_cache.get(key)
+    cache_hit = result is not None
+    if not cache_hit:
+        result = await _extract_once(key, lambda: engine.extract_player_urls(url))
+    headers = {'X-Cache': 'HIT' if cache_hit else 'MISS'}
+    if has_errors(result):
+        headers['Cache-Control'] = http_cache.NO_CACHE
+    return result, 200, headers
+
+
+async def _prefetch_episode(episode_url, key):
+    try:
+        if flask_module.extract_cache.peek(key) is None:
+            with priority('background'):
+                await _extract_once(key, lambda: engine.extract_episode_players(episode_url))
+    except Exception as e:
+        print(f"Error prefetching episode {episode_url}: {e}")
+    finally:
+        _prefetching.discard(key)
+
+
+async def _prefetch_following(series_url, episode_url):
+    try:
+        # Finding them may extract the next page of the episode list
+        with priority('background'):
+            episode_urls = await asyncio.get_running_loop().run_in_executor(None, metrics.run_in_context(
+                flask_module._next_episode_urls, series_url, episode_url, flask_module.EPISODE_PREFETCH_COUNT
+            ))
+    except Exception as e:
+        print(f"Error finding episodes after {episode_url}: {e}")
+        return
+
+    for url in episode_urls:
+        key = 'episode:' + normalize_url(url)
+        if key not in _prefetching:
+            _prefetching.add(key)
+            asyncio.ensure_future(_prefetch_episode(url, key))
+
+
+async def extract_episode_api(data):
+    url = data.get('url')
+    series_url = data.get('series_url')
+    if not url:
+        return {"error": "URL is required"}, 400, None
+
+    url = mirror_pool.canonical_url(url)
+    key = 'episode:' + normalize_url(url)
+    result = flask_module.extract_cache.get(key)
+    cache_hit = result is not None
+    if not cache_hit:
+        result = await _extract_once(key, lambda: engine.extract_episode_players(url))
+
+    # Warm the cache for the episodes the user is likely to open next
+    if series_url and flask_module.EPISODE_PREFETCH_COUNT > 0:
+        asyncio.ensure_future(_prefetch_following(mirror_pool.canonical_url(series_url), url))
+
+    return result['players'], 200, {'X-Cache': 'HIT' if cache_hit else 'MISS'}
+
+
+async def search_api(data):
+    query = data.get('query')
+    if not query:
+        return {"error": "Query is required"}, 400, None
+
+    content_type = data.get('type', None)
+    result = flask_module.search_local_index(query, content_type)
+    if result is None:
+        async def search_upstream():
+            result = await engine.search_movies_series(query, content_type)
+            return flask_module.record_upstream_search(query, content_type, result)
+
+        key = flask_module.search_flight_key(query, content_type)
+        result = (await flask_module.inflight.do_async(key, search_upstream))[0]
+    # An upstream failure must not be cached by browsers and CDNs
+    headers = {'Cache-Control': http_cache.NO_CACHE} if 'error' in result else None
+    return flask_module.proxy_images(result), 200, headers
+
+
+async def latest_api(data):
+    cached = flask_module.latest_cache.peek()
+    if cached is None:
+        # Coalesce concurrent misses into one upstream fetch
+        async def load():
+            cached = flask_module.latest_cache.peek()
+            if cached is not None:
+                return cached[0]
+            value = await engine.get_latest_uploads()
+            flask_module.latest_cache.put(value)
+            return value
+
+        value = (await flask_module.inflight.do_async('latest', load))[0]
+        cached = (value, 0.0, 'miss')
+
+    value, age, status = cached
+    result = dict(value)
+    result['cache_age'] = round(age, 3)
+    result['cache_status'] = status
+    result = flask_module.proxy_images(result)
+    headers = {'ETag': flask_module.latest_etag(result)}
+    if 'error' in result:
+        headers['Cache-Control'] = http_cache.NO_CACHE
+    return result, 200, headers
+
+
+ROUTES = {
+    ('GET', '/api/extract'): extract_api,
+    ('POST', '/api/extract'): extract_api,
+    ('POST', '/api/extract-episode'): extract_episode_api,
+    ('GET', '/api/search'): search_api,
+    ('POST', '/api/search'): search_api,
+    ('GET', '/api/latest'): latest_api,
+}
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await engine.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    handler = None
+    if scope['type'] == 'http' and SCRAPER_ENGINE == 'async':
+        handler = ROUTES.get((scope['method'], scope['path']))
+    if handler is None:
+        await flask_app(scope, receive, send)
+        return
+
+    # Each ASGI request runs in its own task, so the timings stay per request
+    timings = metrics.start_timings()
+    data = await _read_json(receive) if scope['method'] == 'POST' else _read_query(scope)
+    try:
+        payload, status, headers = await handler(data)
+    except Exception as e:
+        payload, status, headers = {"error": f"Server error: {str(e)}"}, 500, None
+
+    headers = dict(headers or {})
+    headers['Server-Timing'] = timings.server_timing()
+    elapsed = timings.elapsed()
+    status = await _send_json(send, scope, payload, status, headers)
+    metrics.api_request_seconds.observe(elapsed, endpoint=scope['path'])
+    metrics.api_responses.inc(endpoint=scope['path'], status=status)
@@ -0,0 +1,231 @@
+"""
+Static asset pipeline.
+
+The build minifies static/app.js and static/styles.css, writes them to
+static/dist/ under names carrying a hash of their content (app.<hash>.js),
+next to gzip and brotli (when the brotli package is installed) variants,
+and records the names in static/dist/manifest.json. The page links the
+fingerprinted names through asset_url(), and AssetServer (WhiteNoise) serves
+them as immutable for ASSETS_MAX_AGE seconds: a changed asset gets a new
+name, so browsers never need to revalidate one. The app builds on startup;
+to build ahead of deployment instead:
+
+    python assets.py
+
+rjsmin and rcssmin are used for minifying when installed, otherwise a
+conservative built-in minifier only drops comments and whitespace.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import uuid
+
+from whitenoise import WhiteNoise
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+ASSETS_MAX_AGE = int(os.environ.get('ASSETS_MAX_AGE', '31536000'))
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+# Assets built, relative to STATIC_DIR
+ASSETS = ('app.js', 'styles.css')
+
+HASH_LENGTH = 12
+FINGERPRINTED = re.compile(r'/dist/[^/]+\.[0-9a-f]{%d}\.\w+$' % HASH_LENGTH)
+
+
+def _minify_js(source):
+    """
+    Drop comments, indentation and blank lines outside strings and template
+    literals. Line breaks are kept, so automatic semicolon insertion sees
+    the same statements.
+    """
+    out = []
+    # Brace depth of every open code frame, None for an open template literal
+    frames = [0]
+    i, n = 0, len(source)
+    while i < n:
+        char = source[i]
+        if frames[-1] is None:
+            if char == '\\':
+                out.append(source[i:i + 2])
+                i += 2
+            elif char == '`':
+                frames.pop()
+                out.append(char)
+                i += 1
+            elif source.startswith('${', i):
+                frames.append(0)
+                out.append('${')
+                i += 2
+            else:
+                out.append(char)
+                i += 1
+            continue
+
+        if char in '\'"':
+            end = i + 1
+            while end < n and source[end] != char:
+                end += 2 if source[end] == '\\' else 1
+            out.append(source[i:end + 1])
+            i = end + 1
+        elif char == '`':
+            frames.append(None)
+            out.append(char)
+            i += 1
+        elif source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end == -1 else end + 2
+        elif char in ' \t\r':
+            while i < n and source[i] in ' \t\r':
+                i += 1
+            if out and not out[-1].endswith('\n'):
+                out.append(' ')
+        elif char == '\n':
+            if out and out[-1] == ' ':
+                out.pop()
+            if out and not out[-1].endswith('\n'):
+                out.append('\n')
+            i += 1
+        else:
+            if char == '{':
+                frames[-1] += 1
+            elif char == '}':
+                if frames[-1] == 0 and len(frames) > 1:
+                    # End of a ${...} expression, back in the template literal
+                    frames.pop()
+                else:
+                    frames[-1] -= 1
+            out.append(char)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+
+def _minify_css(source):
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    source = re.sub(r':\s+', ':', source)
+    return source.replace(';}', '}').strip() + '\n'
+
+
+def minify(name, source):
+    if name.endswith('.js'):
+        return rjsmin.jsmin(source) if rjsmin is not None else _minify_js(source)
+    if name.endswith('.css'):
+        return rcssmin.cssmin(source) if rcssmin is not None else _minify_css(source)
+    return source
+
+
+def fingerprint(name, content):
+    """
+    Name of an asset with the hash of its content, app.js -> app.<hash>.js
+    """
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}{ext}'
+
+
+def _write(path, content):
+    # Several workers may build at once, readers only ever see complete files
+    tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _remove_stale(dist, built):
+    """
+    Delete earlier builds of the assets, leaving other workers' temp files alone
+    """
+    patterns = [
+        re.compile(r'^%s\.[0-9a-f]{%d}%s(\.gz|\.br)?$' % (
+            re.escape(os.path.splitext(os.path.basename(name))[0]), HASH_LENGTH,
+            re.escape(os.path.splitext(name)[1])
+        ))
+        for name in ASSETS
+    ]
+    for filename in os.listdir(dist):
+        if filename in built or not any(pattern.match(filename) for pattern in patterns):
+            continue
+        try:
+            os.unlink(os.path.join(dist, filename))
+        except FileNotFoundError:
+            pass
+
+
+def build(static_dir=STATIC_DIR):
+    """
+    Minify, fingerprint and precompress the assets, returns the manifest
+    {'app.js': 'dist/app.<hash>.js', ...}
+    """
+    dist = os.path.join(static_dir, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+
+    manifest = {}
+    built = set()
+    for name in ASSETS:
+        with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+            content = minify(name, f.read()).encode('utf-8')
+        filename = fingerprint(os.path.basename(name), content)
+        path = os.path.join(dist, filename)
+        _write(path, content)
+        # mtime=0 keeps the gzip bytes identical across builds
+        _write(path + '.gz', gzip.compress(content, compresslevel=9, mtime=0))
+        built.update((filename, filename + '.gz'))
+        if brotli is not None:
+            _write(path + '.br', brotli.compress(content, quality=11))
+            built.add(filename + '.br')
+        manifest[name] = f'{DIST_DIR}/{filename}'
+
+    _write(os.path.join(dist, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _remove_stale(dist, built)
+    return manifest
+
+
+def load_manifest(static_dir=STATIC_DIR):
+    """
+    Manifest of the last build, empty when the assets were never built
+    """
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+class AssetServer(WhiteNoise):
+    """
+    WhiteNoise serving fingerprinted assets as immutable for ASSETS_MAX_AGE
+    seconds, and everything else with its default max_age
+    """
+
+    FOREVER = ASSETS_MAX_AGE
+
+    def immutable_file_test(self, path, url):
+        return bool(FINGERPRINTED.search(url))
+
+
+if __name__ == '__main__':
+    for name, built in build().items():
+        print(f'{name} -> {built}')
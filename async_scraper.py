@@ -0,0 +1,311 @@
+"""
+Asyncio extraction engine.
+
+Implements extract_player_urls, extract_episode_players, search_movies_series
+and get_latest_uploads on top of aiohttp, reusing the page parsing and result
+building of the synchronous scraper in app.py so both engines return the same
+JSON shapes. One process can keep hundreds of extractions waiting on upstream
+I/O at once instead of pinning a worker thread for each of them.
+
+Requires the packages from requirements-async.txt.
+"""
+import asyncio
+import time
+from urllib.parse import urlparse
+
+import aiohttp
+
+import app as scraper
+import http_client
+import metrics
+import parsing
+from cache import normalize_url
+from fetch_pool import FETCH_PER_HOST_LIMIT
+from mirrors import FAILOVER_STATUSES, attempt_urls, mirror_pool, retry_delay
+from pages import Page, page_store
+from scheduler import scheduler, prepaid
+
+
+class AsyncFetchContext:
+    """
+    De-duplicates page fetches within one async extraction
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._tasks = {}
+
+    def get(self, url):
+        key = normalize_url(url)
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self.engine.fetch_page(url))
+        return task
+
+
+async def _on_connection_create_start(session, context, params):
+    context.connect_started = time.perf_counter()
+
+
+async def _on_connection_create_end(session, context, params):
+    # DNS lookup, TCP handshake and TLS negotiation of a new pooled connection
+    metrics.record_stage('connect', time.perf_counter() - context.connect_started)
+
+
+class AsyncScraper:
+    """
+    aiohttp based scraper sharing one connection pool per event loop
+    """
+
+    def __init__(self, per_host_limit=FETCH_PER_HOST_LIMIT):
+        self.per_host_limit = max(1, per_host_limit)
+        self._session = None
+        self._host_semaphores = {}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            headers = {
+                key: value for key, value in http_client.DEFAULT_HEADERS.items()
+                if key not in ('Accept-Encoding', 'Connection')
+            }
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_start.append(_on_connection_create_start)
+            trace_config.on_connection_create_end.append(_on_connection_create_end)
+            self._session = aiohttp.ClientSession(
+                headers=headers,
+                trace_configs=[trace_config],
+                connector=aiohttp.TCPConnector(limit=http_client.HTTP_POOL_MAXSIZE * 4, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=http_client.HTTP_CONNECT_TIMEOUT,
+                    sock_read=http_client.HTTP_READ_TIMEOUT
+                )
+            )
+        return self._session
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._host_semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _get(self, url, headers):
+        """
+        GET a URL once, raising ClientResponseError for a 4xx/5xx answer.
+        Returns (status, headers, body).
+        """
+        session = self._get_session()
+        host = urlparse(url).netloc.lower()
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            async with session.get(url, headers=headers) as response:
+                status = response.status
+                body = b'' if response.status == 304 else await response.read()
+                if response.status >= 400:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history,
+                        status=response.status, message=response.reason or ''
+                    )
+                return response.status, response.headers, body
+        finally:
+            metrics.observe_upstream(host, status, time.perf_counter() - started)
+
+    async def _attempt(self, url, headers):
+        """
+        One request to one mirror, recording the outcome in the mirror pool
+        """
+        host = urlparse(url).netloc.lower()
+        started = time.perf_counter()
+        try:
+            result = await self._get(url, headers)
+        except aiohttp.ClientResponseError as e:
+            if e.status in FAILOVER_STATUSES:
+                mirror_pool.record_failure(host)
+            else:
+                mirror_pool.record_success(host, time.perf_counter() - started)
+            raise
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            mirror_pool.record_failure(host)
+            raise
+        mirror_pool.record_success(host, time.perf_counter() - started)
+        return result
+
+    async def _get_routed(self, url, headers):
+        """
+        GET a URL, routing mirrored pages to the best mirror with failover and
+        retries (and hedging when enabled). Every attempt waits for the
+        outbound scheduler.
+        """
+        attempts = attempt_urls(url)
+        tried = set()
+        retries = 0
+        last_error = None
+        while attempts:
+            primary = attempts.pop(0)
+            if primary in tried:
+                await asyncio.sleep(retry_delay(retries))
+                retries += 1
+            tried.add(primary)
+            await scheduler.acquire_async(mirror_pool.site(primary))
+            delay = None
+            if attempts and attempts[0] != primary:
+                delay = mirror_pool.hedge_delay(urlparse(primary).netloc.lower())
+            tasks = [asyncio.ensure_future(self._attempt(primary, headers))]
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    hedge = attempts.pop(0)
+                    tried.add(hedge)
+                    mirror_pool.record_hedge(urlparse(hedge).netloc.lower())
+                    await scheduler.acquire_async(mirror_pool.site(hedge))
+                    tasks.append(asyncio.ensure_future(self._attempt(hedge, headers)))
+
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    try:
+                        return await next_done
+                    except aiohttp.ClientResponseError as e:
+                        if e.status not in FAILOVER_STATUSES:
+                            raise
+                        last_error = e
+                    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                        last_error = e
+            finally:
+                # The losing hedge is not needed any more
+                for task in tasks:
+                    task.cancel()
+        raise last_error
+
+    async def fetch_page(self, url):
+        """
+        Fetch a page, revalidating a stored copy with a conditional request.
+        Pages on a mirror are fetched from the best mirror and keyed by their
+        canonical URL.
+        """
+        url = mirror_pool.canonical_url(url)
+        key = normalize_url(url)
+        stored = page_store.get(key)
+        headers = {}
+        if stored is not None:
+            if stored.etag:
+                headers['If-None-Match'] = stored.etag
+            if stored.last_modified:
+                headers['If-Modified-Since'] = stored.last_modified
+
+        page_store.count('fetches')
+        if headers:
+            page_store.count('conditional_requests')
+
+        # Wait for the scheduler before taking a host slot, so fetches queued
+        # at a low priority never hold slots that interactive ones need
+        site = mirror_pool.site(url)
+        await scheduler.acquire_async(site)
+        async with self._host_semaphore(url):
+            with prepaid(site), metrics.stage('upstream'):
+                status, response_headers, body = await self._get_routed(url, headers)
+
+        if status == 304 and stored is not None:
+            page_store.count('not_modified')
+            page_store.count('bytes_saved', len(stored.content))
+            return stored
+
+        if mirror_pool.is_mirror(url):
+            body = mirror_pool.rewrite_content(body)
+        page = Page(url, body, response_headers.get('ETag'), response_headers.get('Last-Modified'))
+        if page.etag or page.last_modified:
+            page_store.put(key, page)
+        return page
+
+    async def _parsed(self, page, kind, parse_fn):
+        # Full page parses are CPU bound, keep them off the event loop
+        return await asyncio.to_thread(page.parsed, kind, parse_fn)
+
+    async def _fetch_iframe_url(self, player_url, pages):
+        try:
+            page = await pages.get(player_url)
+            return page.parsed('iframe', parsing.extract_iframe_url), None
+        except Exception as e:
+            return "", str(e) or type(e).__name__
+
+    async def _resolve_players(self, player_pages, pages):
+        results = await asyncio.gather(*[
+            self._fetch_iframe_url(player_url, pages) for _, player_url in player_pages
+        ])
+        return [
+            scraper.player_entry(server_name, player_url, iframe_url, error)
+            for (server_name, player_url), (iframe_url, error) in zip(player_pages, results)
+        ]
+
+    async def extract_player_urls(self, base_url):
+        """
+        Extract all player URLs from a movie or series page
+        """
+        pages = AsyncFetchContext(self)
+
+        try:
+            page = await pages.get(base_url)
+            soup = await self._parsed(page, 'content', parsing.parse_content_page)
+            title, is_series = scraper.inspect_content_page(base_url, soup)
+
+            if is_series:
+                result = scraper.extract_series_episodes(base_url, soup, title)
+            else:
+                player_pages = [
+                    (info['server_name'], info['player_page_url'])
+                    for info in scraper.movie_player_pages(base_url, soup)
+                ]
+                result = {
+                    'title': title,
+                    'url': base_url,
+                    'type': 'movie',
+                    'players': await self._resolve_players(player_pages, pages)
+                }
+
+            scraper.index_result(result)
+            return result
+
+        except Exception as e:
+            return {"error": f"Failed to extract players: {str(e)}"}
+
+    async def extract_episode_players(self, episode_url):
+        """
+        Extract player URLs for a single episode (Server 1 through Server 6)
+        """
+        pages = AsyncFetchContext(self)
+        return {
+            'url': episode_url,
+            'players': await self._resolve_players(scraper.episode_player_pages(episode_url), pages)
+        }
+
+    async def search_movies_series(self, query, content_type=None):
+        """
+        Search for movies and series on the website
+        """
+        try:
+            search_url = scraper.build_search_url(query, content_type)
+            page = await self.fetch_page(search_url)
+            soup = await self._parsed(page, 'search', parsing.parse_search_page)
+            return scraper.parse_search_results(query, soup)
+
+        except Exception as e:
+            return {"error": f"Search failed: {str(e)}"}
+
+    async def get_latest_uploads(self):
+        """
+        Get latest uploads from the main page
+        """
+        try:
+            page = await self.fetch_page(f"{mirror_pool.base_url}/")
+            soup = await self._parsed(page, 'latest', parsing.parse_latest_page)
+            result = scraper.parse_latest_uploads(soup)
+            scraper.index_result(result)
+            return result
+
+        except Exception as e:
+            return {"error": f"Failed to get latest uploads: {str(e)}"}
@@ -0,0 +1,244 @@
+"""
+Load benchmark for the scraper API against the local fixture origin.
+
+Starts bench/origin.py and the Flask app in-process (the app is pointed at the
+origin through UPSTREAM_MIRRORS), then drives each scenario with a number of
+concurrent clients and reports latency percentiles, throughput and how many
+upstream requests the scenario caused.
+
+Scenarios:
+    latest    GET /api/latest
+    search    POST /api/search, cycling through --keys queries
+    movie     POST /api/extract for movie pages, cycling through --keys titles
+    series    POST /api/extract for series pages, cycling through --keys titles
+    episode   POST /api/extract-episode, cycling through --keys episodes
+
+Use a new --keys value (or --distinct for one title per request) to measure
+cold caches. --json writes the report for later runs to --compare against.
+To benchmark a separately started server (gunicorn, asgi.py), pass --target
+with the server URL and --origin with the URL of a running bench/origin.py.
+
+Usage:
+    python bench/load.py [--scenario all] [--requests 200] [--concurrency 16]
+                         [--latency 80] [--jitter 30] [--keys 20] [--distinct]
+                         [--json report.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from origin import Origin  # noqa: E402
+
+SCENARIOS = ('latest', 'search', 'movie', 'series', 'episode')
+
+
+def build_request(scenario, index, origin_url, keys, distinct):
+    """
+    Return (method, path, json_body) for request number index of a scenario
+    """
+    key = index if distinct else index % keys
+    if scenario == 'latest':
+        return 'GET', '/api/latest', None
+    if scenario == 'search':
+        return 'POST', '/api/search', {'query': f'movie {key}'}
+    if scenario == 'movie':
+        return 'POST', '/api/extract', {'url': f'{origin_url}/movie-{key}-2025/'}
+    if scenario == 'series':
+        return 'POST', '/api/extract', {'url': f'{origin_url}/tv/show-{key}/'}
+    if scenario == 'episode':
+        return 'POST', '/api/extract-episode', {'url': f'{origin_url}/eps/show-s1e{key}/'}
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+def percentile(ordered, percent):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class OriginClient:
+    """
+    Reads and resets the request counters of an in-process or remote origin
+    """
+
+    def __init__(self, origin=None, url=None):
+        self.origin = origin
+        self.url = url
+
+    def reset(self):
+        if self.origin is not None:
+            self.origin.reset()
+        else:
+            requests.post(f'{self.url}/__origin/reset', timeout=10)
+
+    def stats(self):
+        if self.origin is not None:
+            return self.origin.stats()
+        return requests.get(f'{self.url}/__origin/stats', timeout=10).json()
+
+
+def run_scenario(scenario, target, origin_url, origin_client, args):
+    local = threading.local()
+
+    def call(index):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        method, path, body = build_request(scenario, index, origin_url, args.keys, args.distinct)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, target + path, json=body, timeout=120)
+            payload = response.json()
+            ok = response.ok and not (isinstance(payload, dict) and 'error' in payload)
+        except (requests.RequestException, ValueError):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    origin_client.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(call, range(args.requests)))
+    duration = time.perf_counter() - started
+    upstream = origin_client.stats()
+
+    latencies = sorted(latency * 1000 for latency, _ in outcomes)
+    return {
+        'scenario': scenario,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(args.requests / duration, 2),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 2),
+            'p95': round(percentile(latencies, 95), 2),
+            'p99': round(percentile(latencies, 99), 2),
+            'max': round(latencies[-1], 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+        },
+        'upstream_requests': upstream.get('total', 0),
+        'upstream_not_modified': upstream.get('not_modified', 0),
+        'upstream_per_request': round(upstream.get('total', 0) / args.requests, 3),
+    }
+
+
+def start_local_app(origin):
+    """
+    Import the app pointed at the origin and serve it on a free local port
+    """
+    os.environ['UPSTREAM_MIRRORS'] = origin.netloc
+    os.environ['UPSTREAM_SCHEME'] = 'http'
+    os.environ.setdefault('WARMER_ENABLED', '0')
+
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    import app as scraper_app
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, scraper_app.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name='app', daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+def _flatten(report):
+    row = {key: value for key, value in report.items() if key != 'latency_ms'}
+    row.update({f'{key}_ms': value for key, value in report['latency_ms'].items()})
+    return row
+
+
+def print_report(reports):
+    print(f"{'scenario':<9} {'reqs':>5} {'err':>4} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9} "
+          f"{'upstream':>9} {'up/req':>7}")
+    for report in reports:
+        latency = report['latency_ms']
+        print(f"{report['scenario']:<9} {report['requests']:>5} {report['errors']:>4} "
+              f"{report['throughput_rps']:>8.1f} {latency['p50']:>9.1f} {latency['p95']:>9.1f} "
+              f"{latency['p99']:>9.1f} {latency['max']:>9.1f} {report['upstream_requests']:>9} "
+              f"{report['upstream_per_request']:>7.2f}")
+
+
+def print_comparison(reports, baseline):
+    """
+    Print every metric next to the same metric of a previous run
+    """
+    previous = {report['scenario']: _flatten(report) for report in baseline['scenarios']}
+    metrics = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'upstream_requests', 'errors')
+    print(f"\n{'scenario':<9} {'metric':<18} {'baseline':>10} {'current':>10} {'change':>8}")
+    for report in reports:
+        before = previous.get(report['scenario'])
+        if before is None:
+            continue
+        current = _flatten(report)
+        for metric in metrics:
+            old, new = before.get(metric), current.get(metric)
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"{report['scenario']:<9} {metric:<18} {old:>10} {new:>10} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', default='all', choices=('all',) + SCENARIOS)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=80, help='origin response delay in milliseconds')
+    parser.add_argument('--jitter', type=float, default=30, help='origin random +/- delay in milliseconds')
+    parser.add_argument('--etags', action='store_true', help='origin sends ETags and answers revalidations with 304')
+    parser.add_argument('--keys', type=int, default=20, help='distinct titles/queries each scenario cycles through')
+    parser.add_argument('--distinct', action='store_true', help='use a new title/query for every request')
+    parser.add_argument('--target', help='URL of an already running app to benchmark')
+    parser.add_argument('--origin', help='URL of the bench/origin.py the --target app talks to')
+    parser.add_argument('--json', help='write the report to this file')
+    parser.add_argument('--compare', help='report written by an earlier run to compare against')
+    args = parser.parse_args()
+
+    if args.target:
+        if not args.origin:
+            parser.error('--origin is required with --target')
+        target, origin_url = args.target.rstrip('/'), args.origin.rstrip('/')
+        origin_client = OriginClient(url=origin_url)
+    else:
+        origin = Origin(latency=args.latency, jitter=args.jitter, etags=args.etags).start()
+        target, origin_url = start_local_app(origin), origin.base_url
+        origin_client = OriginClient(origin=origin)
+
+    scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    print(f"target {target}, origin {origin_url}, {args.requests} requests x {args.concurrency} clients, "
+          f"{'distinct' if args.distinct else args.keys} keys")
+    reports = [run_scenario(scenario, target, origin_url, origin_client, args) for scenario in scenarios]
+    print_report(reports)
+
+    result = {
+        'settings': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'latency_ms': None if args.target else args.latency,
+            'jitter_ms': None if args.target else args.jitter,
+            'keys': None if args.distinct else args.keys,
+        },
+        'scenarios': reports,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(reports, json.load(f))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"\nreport written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Local stand-in for the upstream site, serving the recorded fixtures.
+
+Every response is delayed by --latency milliseconds plus a uniform random
+jitter of up to +/- --jitter milliseconds. Links to the real mirrors inside
+the fixtures are rewritten to point at this server, so a scraper configured
+with UPSTREAM_MIRRORS=127.0.0.1:<port> and UPSTREAM_SCHEME=http never leaves
+the machine. Routes:
+
+    /                     home page (latest uploads)
+    /?s=...               search results
+    /tv/<slug>/           series page
+    /eps/<slug>/          episode page (also the player page of Server 1)
+    /<slug>/?player=N     player page
+    /<slug>/              movie page
+    /images/<name>        poster image (the same small GIF for every name)
+
+Request counts per page type are served as JSON at /__origin/stats and reset
+with POST /__origin/reset.
+
+Usage:
+    python bench/origin.py [--port 8081] [--latency 80] [--jitter 30] [--etags]
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+RECORDED_HOSTS = ('new17.ngefilm.site', 'new18.ngefilm.site')
+# Poster host of the synthetic fixtures, served from /images/
+SYNTHETIC_IMAGE_HOST = 'https://img.example/'
+
+# 1x1 transparent GIF
+POSTER = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+def load_fixtures(base_url):
+    fixtures = {}
+    for name in ('home', 'search', 'movie', 'series', 'player'):
+        with open(os.path.join(FIXTURES_DIR, f'{name}.html'), 'rb') as f:
+            content = f.read()
+        for host in RECORDED_HOSTS:
+            content = content.replace(f'https://{host}'.encode(), base_url.encode())
+            content = content.replace(f'//{host}'.encode(), base_url.split(':', 1)[1].encode())
+        content = content.replace(SYNTHETIC_IMAGE_HOST.encode(), f'{base_url}/images/'.encode())
+        fixtures[name] = content
+    fixtures['image'] = POSTER
+    return fixtures
+
+
+def route(path, query):
+    """
+    Pick the fixture serving a request path
+    """
+    params = parse_qs(query)
+    if path.startswith('/images/'):
+        return 'image'
+    if 's' in params:
+        return 'search'
+    if path in ('', '/'):
+        return 'home'
+    if 'player' in params or path.startswith('/eps/'):
+        return 'player'
+    if path.startswith('/tv/'):
+        return 'series'
+    return 'movie'
+
+
+class Origin:
+    """
+    Fixture origin server running on a background thread
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, etags=False):
+        self.latency = latency
+        self.jitter = jitter
+        self.etags = etags
+        self._lock = threading.Lock()
+        self._counts = {}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+        self.base_url = f'http://{self.host}:{self.port}'
+        self.fixtures = load_fixtures(self.base_url)
+        self._etags = {name: '"%s"' % hashlib.sha1(content).hexdigest()[:16] for name, content in self.fixtures.items()}
+        self._thread = None
+
+    @property
+    def netloc(self):
+        return f'{self.host}:{self.port}'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='origin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts['total'] = sum(value for key, value in counts.items() if key != 'not_modified')
+        return counts
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+    def delay(self):
+        seconds = (self.latency + random.uniform(-self.jitter, self.jitter)) / 1000
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _handler_class(self):
+        origin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == '/__origin/stats':
+                    return self._send(200, json.dumps(origin.stats()).encode(), 'application/json')
+
+                name = route(parts.path, parts.query)
+                origin.count(name)
+                origin.delay()
+
+                etag = origin._etags[name] if origin.etags else None
+                if etag and self.headers.get('If-None-Match') == etag:
+                    origin.count('not_modified')
+                    return self._send(304, b'', None, etag)
+                content_type = 'image/gif' if name == 'image' else 'text/html; charset=UTF-8'
+                return self._send(200, origin.fixtures[name], content_type, etag)
+
+            def do_POST(self):
+                if urlsplit(self.path).path == '/__origin/reset':
+                    origin.reset()
+                    return self._send(204, b'', None)
+                return self._send(404, b'', None)
+
+            def _send(self, status, body, content_type, etag=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=80, help='response delay in milliseconds')
+    parser.add_argument('--jitter', type=float, default=30, help='random +/- delay in milliseconds')
+    parser.add_argument('--etags', action='store_true', help='send ETags and answer revalidations with 304')
+    args = parser.parse_args()
+
+    origin = Origin(args.host, args.port, args.latency, args.jitter, args.etags)
+    print(f"serving fixtures at {origin.base_url} "
+          f"(latency {args.latency}ms +/- {args.jitter}ms)")
+    print(f"run the app with UPSTREAM_MIRRORS={origin.netloc} UPSTREAM_SCHEME=http")
+    try:
+        origin.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Micro-benchmark for the HTML parsing layer.
+
+Builds synthetic pages shaped like the upstream theme (home grid, search
+results, movie page with server tabs, series page with an episode list and a
+player page) and reports the parse time per page type for the old full
+html.parser parse versus the strained / fast-path parsing in parsing.py.
+
+Usage:
+    python bench/parse_benchmark.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import parsing  # noqa: E402
+
+
+def _chrome(body):
+    # Head, navigation, sidebar and footer noise every upstream page carries
+    scripts = ''.join(
+        f'<script type="text/javascript" id="script-{i}">var cfg{i} = {{"a": "{"x" * 200}"}};</script>'
+        for i in range(24)
+    )
+    # Embed snippets in scripts must not fool the iframe fast path
+    scripts += '<script>var embed = "<iframe src=\'https://ads.example/\'></iframe>";</script>'
+    styles = ''.join(f'<link rel="stylesheet" href="/wp-content/style-{i}.css">' for i in range(15))
+    menu = ''.join(f'<li class="menu-item"><a href="/genre/genre-{i}/">Genre {i}</a></li>' for i in range(60))
+    sidebar = ''.join(
+        f'<div class="widget"><h3 class="widget-title">Widget {i}</h3>'
+        f'<ul>{"".join(f"<li><a href=/post-{i}-{j}/>Post {j}</a></li>" for j in range(10))}</ul></div>'
+        for i in range(8)
+    )
+    return (
+        f'<!DOCTYPE html><html><head><title>Page</title>{styles}{scripts}</head><body>'
+        f'<header><nav><ul class="menu">{menu}</ul></nav></header>'
+        f'<main>{body}</main><aside>{sidebar}</aside>'
+        f'<footer><p>Footer</p>{scripts}</footer></body></html>'
+    )
+
+
+def _article(i):
+    return (
+        f'<article class="item-infinite col-md-20 item" itemscope="itemscope">'
+        f'<div class="gmr-box-content"><div class="content-thumbnail">'
+        f'<a href="https://new18.ngefilm.site/movie-{i}-2025/"><img data-src="https://img.example/{i}.jpg" src="data:image/gif"></a>'
+        f'<div class="gmr-rating-item"><span class="icon_star"></span> 7.{i % 10}</div></div>'
+        f'<div class="item-article"><h2 class="entry-title"><a href="https://new18.ngefilm.site/movie-{i}-2025/">Movie {i} (2025)</a></h2>'
+        f'<time class="screen-reader-text" datetime="2025-01-0{i % 9 + 1}T00:00:00+00:00"></time></div></div></article>'
+    )
+
+
+def home_page():
+    grid = ''.join(_article(i) for i in range(24))
+    return _chrome(f'<h3 class="homemodule-title">Upload Terbaru</h3><div id="gmr-main-load">{grid}</div>').encode()
+
+
+def search_page():
+    return _chrome(''.join(_article(i) for i in range(20))).encode()
+
+
+def movie_page():
+    tabs = ''.join(f'<li><a href="?player={i}">Server {i}</a></li>' for i in range(1, 7))
+    return _chrome(
+        '<h1 class="entry-title">Movie 1 (2025)</h1>'
+        f'<ul class="muvipro-player-tabs">{tabs}</ul>'
+        '<div class="entry-content">' + '<p>Synopsis text.</p>' * 40 + '</div>'
+    ).encode()
+
+
+def series_page():
+    episodes = ''.join(f'<a href="https://new18.ngefilm.site/eps/show-s1e{i}/">Eps{i}</a>' for i in range(1, 41))
+    return _chrome(
+        '<h1 class="entry-title">Show Season 1</h1>'
+        f'<div class="gmr-listseries"><a href="#">Pilih Episode</a>{episodes}</div>'
+        '<div class="entry-content">' + '<p>Synopsis text.</p>' * 40 + '</div>'
+    ).encode()
+
+
+def player_page():
+    return _chrome(
+        '<h1 class="entry-title">Movie 1 (2025)</h1>'
+        '<div class="gmr-embed-responsive"><iframe data-litespeed-src="https://player.example/e/abc123" '
+        'src="about:blank" frameborder="0" allowfullscreen></iframe></div>'
+    ).encode()
+
+
+def _full_iframe_url(markup):
+    iframe = BeautifulSoup(markup, 'html.parser').find('iframe')
+    if not iframe:
+        return ''
+    iframe_url = iframe.get('data-litespeed-src') or iframe.get('src')
+    return '' if iframe_url == 'about:blank' else iframe_url or ''
+
+
+CASES = [
+    ('home', home_page, parsing.parse_latest_page),
+    ('search', search_page, parsing.parse_search_page),
+    ('movie', movie_page, parsing.parse_content_page),
+    ('series', series_page, parsing.parse_content_page),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"parser backend: {parsing.HTML_PARSER}, repeat: {args.repeat}")
+    print(f"{'page':<8} {'size':>8} {'full (ms)':>10} {'layer (ms)':>11} {'speedup':>8}")
+
+    def report(name, markup, baseline, optimized):
+        full = timeit.timeit(baseline, number=args.repeat) / args.repeat * 1000
+        fast = timeit.timeit(optimized, number=args.repeat) / args.repeat * 1000
+        print(f"{name:<8} {len(markup) // 1024:>6}KB {full:>10.2f} {fast:>11.3f} {full / fast:>7.1f}x")
+
+    for name, build, parse_page in CASES:
+        markup = build()
+        report(name, markup,
+               lambda: BeautifulSoup(markup, 'html.parser'),
+               lambda: parse_page(markup))
+
+    markup = player_page()
+    assert parsing.extract_iframe_url(markup) == _full_iframe_url(markup)
+    report('player', markup,
+           lambda: _full_iframe_url(markup),
+           lambda: parsing.extract_iframe_url(markup))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Record the HTML fixtures served by the benchmark origin (bench/origin.py).
+
+Fetches the home page, a search page, a movie page with player tabs, a series
+page with an episode list and a player page from the live site and stores
+them in bench/fixtures. With --synthetic the fixtures are written from the
+page builders in parse_benchmark.py instead, for machines without access to
+the live site.
+
+Usage:
+    python bench/record_fixtures.py --movie URL --series URL [--query text]
+    python bench/record_fixtures.py --synthetic
+"""
+import argparse
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+FIXTURES = ('home', 'search', 'movie', 'series', 'player')
+
+
+def record_live(movie_url, series_url, query):
+    import http_client
+    from app import build_search_url
+    from mirrors import mirror_pool
+
+    urls = {
+        'home': f"{mirror_pool.base_url}/",
+        'search': build_search_url(query),
+        'movie': movie_url,
+        'series': series_url,
+        'player': f"{movie_url}{'&' if '?' in movie_url else '?'}player=2",
+    }
+    pages = {}
+    for name, url in urls.items():
+        response = http_client.get(url)
+        response.raise_for_status()
+        pages[name] = response.content
+        print(f"recorded {name:<7} {len(response.content) // 1024:>5}KB  {url}")
+    return pages
+
+
+def record_synthetic():
+    import parse_benchmark
+
+    return {
+        'home': parse_benchmark.home_page(),
+        'search': parse_benchmark.search_page(),
+        'movie': parse_benchmark.movie_page(),
+        'series': parse_benchmark.series_page(),
+        'player': parse_benchmark.player_page(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--movie', help='URL of a movie page with player tabs')
+    parser.add_argument('--series', help='URL of a series page with an episode list')
+    parser.add_argument('--query', default='love', help='search query to record')
+    parser.add_argument('--synthetic', action='store_true', help='write synthetic fixtures instead')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        pages = record_synthetic()
+    elif args.movie and args.series:
+        pages = record_live(args.movie, args.series, args.query)
+    else:
+        parser.error('--movie and --series are required unless --synthetic is given')
+
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for name in FIXTURES:
+        with open(os.path.join(FIXTURES_DIR, f'{name}.html'), 'wb') as f:
+            f.write(pages[name])
+    print(f"wrote {len(FIXTURES)} fixtures to {FIXTURES_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,359 @@
+"""
+Caches for upstream scrape results
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+class StaleWhileRevalidateCache:
+    """
+    Cache a single loader result with stale-while-revalidate semantics.
+
+    Fresh values are returned straight from memory. Once the TTL has passed,
+    the stale value is still served instantly while exactly one background
+    thread refreshes it. Callers arriving while nothing usable is cached are
+    coalesced onto a single upstream load.
+    """
+
+    def __init__(self, loader, ttl, max_stale, cacheable=None):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.cacheable = cacheable or (lambda value: True)
+        self._lock = threading.Lock()
+        self._value = None
+        self._stored_at = None
+        self._inflight = None
+        self._last_result = None
+        self._stats = {'fresh': 0, 'stale': 0, 'miss': 0, 'refreshes': 0, 'refresh_errors': 0}
+
+    def get(self):
+        """
+        Return (value, age_in_seconds, status) where status is one of
+        'fresh', 'stale' or 'miss'
+        """
+        cached = self.peek()
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            self._stats['miss'] += 1
+            inflight = self._inflight
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight = threading.Event()
+
+        if leader:
+            self._refresh(inflight)
+        else:
+            inflight.wait()
+
+        with self._lock:
+            value, error = self._last_result
+        if error is not None:
+            raise error
+        return value, 0.0, 'miss'
+
+    def peek(self):
+        """
+        Like get(), but never loads on a miss: returns None instead so the
+        caller can load the value itself and put() it
+        """
+        with self._lock:
+            if self._stored_at is None:
+                return None
+            age = time.monotonic() - self._stored_at
+            if age < self.ttl:
+                self._stats['fresh'] += 1
+                return self._value, age, 'fresh'
+            if age < self.ttl + self.max_stale:
+                self._stats['stale'] += 1
+                if self._inflight is None:
+                    self._inflight = threading.Event()
+                    threading.Thread(target=self._refresh, args=(self._inflight,), daemon=True).start()
+                return self._value, age, 'stale'
+            return None
+
+    def put(self, value):
+        """
+        Store a value loaded outside of the cache
+        """
+        with self._lock:
+            self._stats['miss'] += 1
+            if self.cacheable(value):
+                self._value = value
+                self._stored_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._value = None
+            self._stored_at = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['age'] = None if self._stored_at is None else round(time.monotonic() - self._stored_at, 3)
+        return stats
+
+    def _refresh(self, inflight):
+        value, error = None, None
+        try:
+            value = self.loader()
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            self._stats['refreshes'] += 1
+            if error is None and self.cacheable(value):
+                self._value = value
+                self._stored_at = time.monotonic()
+            else:
+                # Keep serving the previous good value until it expires
+                self._stats['refresh_errors'] += 1
+            self._last_result = (value, error)
+            self._inflight = None
+        inflight.set()
+
+
+def normalize_url(url):
+    """
+    Normalize a content URL so equivalent spellings share one cache entry
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    netloc = parts.netloc.lower()
+    path = parts.path or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def has_errors(result):
+    """
+    Check whether an extraction result failed or is only partially resolved
+    """
+    if not isinstance(result, dict) or 'error' in result:
+        return True
+    players = list(result.get('players', []))
+    for episode in result.get('episodes', []):
+        if 'error' in episode:
+            return True
+        players.extend(episode.get('players', []))
+    return any('error' in player for player in players)
+
+
+class MemoryBackend:
+    """
+    In-process LRU store
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        """
+        Return (value, expired) for a key, or None when it is not stored
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None, True
+            self._entries.move_to_end(key)
+            return value, False
+
+    def set(self, key, value, expires_at):
+        """
+        Store a value and return how many entries were evicted to make room
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    On-disk LRU store shared by every worker process pointing at the same file
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, '
+                'expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+            # Cross-process single-flight locks, a released lock keeps the result for its waiters
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS locks ('
+                'key TEXT PRIMARY KEY, owner TEXT, value TEXT, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        with self._connect() as conn:
+            row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None, True
+            conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            return json.loads(row[0]), False
+
+    def set(self, key, value, expires_at):
+        with self._connect() as conn:
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(value), expires_at, now)
+            )
+            conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+            overflow = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self.max_entries
+            if overflow <= 0:
+                return 0
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)',
+                (overflow,)
+            )
+            return overflow
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def lock(self, key, owner, ttl):
+        """
+        Take the lock on key unless another owner holds it, returns whether it was taken
+        """
+        with self._connect() as conn:
+            now = time.time()
+            conn.execute('DELETE FROM locks WHERE expires_at <= ? OR (key = ? AND owner IS NULL)', (now, key))
+            inserted = conn.execute(
+                'INSERT OR IGNORE INTO locks (key, owner, value, expires_at) VALUES (?, ?, NULL, ?)',
+                (key, owner, now + ttl)
+            )
+            return inserted.rowcount == 1
+
+    def unlock(self, key, owner, value=None, result_ttl=0):
+        """
+        Release a lock taken with lock(), leaving value behind for
+        result_ttl seconds for the workers waiting on it
+        """
+        with self._connect() as conn:
+            if value is None:
+                conn.execute('DELETE FROM locks WHERE key = ? AND owner = ?', (key, owner))
+            else:
+                conn.execute(
+                    'UPDATE locks SET owner = NULL, value = ?, expires_at = ? WHERE key = ? AND owner = ?',
+                    (json.dumps(value), time.time() + result_ttl, key, owner)
+                )
+
+    def lock_state(self, key):
+        """
+        Return (locked, value) for key, value being the result left behind
+        by the last owner once the lock is released
+        """
+        row = self._connect().execute(
+            'SELECT owner, value, expires_at FROM locks WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None or row[2] <= time.time():
+            return False, None
+        if row[0] is not None:
+            return True, None
+        return False, json.loads(row[1])
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of JSON-serializable results on a pluggable backend.
+    Results containing errors are kept for error_ttl instead of ttl.
+    """
+
+    def __init__(self, backend, ttl, error_ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'expired': 0, 'stores': 0, 'evictions': 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get(self, key):
+        """
+        Return the cached value for key, or None
+        """
+        entry = self.backend.get(key, time.time())
+        if entry is None or entry[1]:
+            if entry is not None:
+                self._count('expired')
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry[0]
+
+    def peek(self, key):
+        """
+        Return the cached value for key without touching the hit/miss counters
+        """
+        entry = self.backend.get(key, time.time())
+        if entry is None or entry[1]:
+            return None
+        return entry[0]
+
+    def set(self, key, value):
+        ttl = self.error_ttl if has_errors(value) else self.ttl
+        evicted = self.backend.set(key, value, time.time() + ttl)
+        self._count('stores')
+        if evicted:
+            self._count('evictions', evicted)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        stats['entries'] = len(self.backend)
+        stats['backend'] = type(self.backend).__name__
+        return stats
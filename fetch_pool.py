@@ -0,0 +1,130 @@
+"""
+Bounded-concurrency fetch engine used by the extractors.
+
+Player pages are independent of each other, so instead of fetching them one
+after another they are fanned out over a shared thread pool. A per-host
+semaphore bounds the concurrent requests to a single upstream, the request
+rate is left to the outbound scheduler. map() returns results in the order
+the work was submitted, imap_unordered() yields them as they finish.
+
+Both take an optional admit(url) that is called on the caller's thread
+before each url is submitted, so waiting for the scheduler (and rate
+budgets) happens there rather than on a pool thread holding a host slot.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import metrics
+
+# Concurrency limits, configurable through the environment
+FETCH_MAX_WORKERS = int(os.environ.get('FETCH_MAX_WORKERS', '16'))
+FETCH_PER_HOST_LIMIT = int(os.environ.get('FETCH_PER_HOST_LIMIT', '6'))
+
+
+class FetchPool:
+    """
+    Thread pool with a concurrency limit per upstream host
+    """
+
+    def __init__(self, max_workers=FETCH_MAX_WORKERS, per_host_limit=FETCH_PER_HOST_LIMIT):
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='fetch')
+        self._host_semaphores = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _run(self, fn, url, args):
+        with self._host_semaphore(url):
+            return fn(url, *args)
+
+    def _submit(self, fn, url, args, admit):
+        if admit is not None:
+            admit(url)
+        return self._executor.submit(metrics.run_in_context(self._run, fn, url, args))
+
+    def map(self, fn, urls, *args, admit=None):
+        """
+        Call fn(url, *args) for every url concurrently and return the results
+        in the same order as urls. Exceptions raised by fn are re-raised.
+        """
+        futures = [self._submit(fn, url, args, admit) for url in urls]
+        return [future.result() for future in futures]
+
+    def imap_unordered(self, fn, urls, *args, admit=None):
+        """
+        Call fn(url, *args) for every url concurrently and yield
+        (index, result) pairs as soon as each call finishes
+        """
+        futures = {}
+        for index, url in enumerate(urls):
+            futures[self._submit(fn, url, args, admit)] = index
+            # Hand out what finished while the next url waited for admission
+            for future in [future for future in futures if future.done()]:
+                yield futures.pop(future), future.result()
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter: rate tokens per second, bursts of up to burst
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = max(0.001, rate)
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """
+        Block until tokens are available and take them, returns the time waited
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, tokens=1):
+        """
+        Take tokens if they are available without blocking. Returns 0 when
+        they were taken, otherwise the seconds until they will be available.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def available(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+# Process-wide pool shared by every request handled by this worker
+fetch_pool = FetchPool()
@@ -0,0 +1,128 @@
+"""
+HTTP caching and compression for the JSON API.
+
+GET responses carry an ETag derived from their content, so a client or CDN
+revalidating with If-None-Match gets an empty 304 when nothing changed, and
+a Cache-Control policy per endpoint (max-age plus stale-while-revalidate)
+so most repeat reads never reach us at all. Responses of at least
+API_COMPRESSION_MIN_SIZE bytes are sent with brotli (when the brotli package
+is installed) or gzip, whichever the client accepts.
+"""
+import gzip
+import hashlib
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', '1024'))
+API_LATEST_MAX_AGE = int(os.environ.get('API_LATEST_MAX_AGE', '60'))
+API_LATEST_STALE_WHILE_REVALIDATE = int(os.environ.get('API_LATEST_STALE_WHILE_REVALIDATE', '300'))
+API_SEARCH_MAX_AGE = int(os.environ.get('API_SEARCH_MAX_AGE', '300'))
+API_SEARCH_STALE_WHILE_REVALIDATE = int(os.environ.get('API_SEARCH_STALE_WHILE_REVALIDATE', '3600'))
+API_EXTRACT_MAX_AGE = int(os.environ.get('API_EXTRACT_MAX_AGE', '600'))
+API_EXTRACT_STALE_WHILE_REVALIDATE = int(os.environ.get('API_EXTRACT_STALE_WHILE_REVALIDATE', '3600'))
+
+# Cache-Control of successful GET responses per path
+CACHE_POLICIES = {
+    '/api/latest': f'public, max-age={API_LATEST_MAX_AGE}, stale-while-revalidate={API_LATEST_STALE_WHILE_REVALIDATE}',
+    '/api/search': f'public, max-age={API_SEARCH_MAX_AGE}, stale-while-revalidate={API_SEARCH_STALE_WHILE_REVALIDATE}',
+    '/api/extract': f'public, max-age={API_EXTRACT_MAX_AGE}, stale-while-revalidate={API_EXTRACT_STALE_WHILE_REVALIDATE}',
+}
+
+# Results that may resolve on a retry are revalidated on every use
+NO_CACHE = 'no-cache'
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def etag(body):
+    """
+    Weak ETag of a response body: equal JSON means equal ETag, whatever the
+    content encoding it is sent with
+    """
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def etag_matches(if_none_match, current):
+    """
+    Weak comparison of an If-None-Match header against the current ETag
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = current[2:] if current.startswith('W/') else current
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding):
+    """
+    Pick br or gzip from an Accept-Encoding header, None for identity
+    """
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding == 'br' and brotli is None:
+            continue
+        if accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def _add_vary(headers, value):
+    vary = headers.get('Vary')
+    if not vary:
+        headers['Vary'] = value
+    elif value.lower() not in [part.strip().lower() for part in vary.split(',')]:
+        headers['Vary'] = f'{vary}, {value}'
+
+
+def finalize(method, path, status, headers, body, if_none_match=None, accept_encoding=None):
+    """
+    Add caching headers to a JSON API response and compress it. headers (a
+    dict or werkzeug Headers) is updated in place, returns (status, body).
+    """
+    compressible = len(body) >= API_COMPRESSION_MIN_SIZE
+    if compressible:
+        _add_vary(headers, 'Accept-Encoding')
+
+    if method == 'GET' and status == 200:
+        policy = CACHE_POLICIES.get(path)
+        if policy is not None and 'Cache-Control' not in headers:
+            headers['Cache-Control'] = policy
+        if 'ETag' not in headers:
+            headers['ETag'] = etag(body)
+        if etag_matches(if_none_match, headers['ETag']):
+            return 304, b''
+
+    encoding = choose_encoding(accept_encoding) if compressible else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    return status, body
@@ -0,0 +1,149 @@
+"""
+Process-wide pooled HTTP client shared by every scraper function.
+
+All upstream traffic goes through one requests.Session so TCP/TLS connections
+to the upstream hosts are kept alive and reused instead of being opened for
+every single page. Headers, timeouts and retry behaviour live here as well.
+"""
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+
+import metrics
+
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', '10'))
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '32'))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', '10'))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', '30'))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '2'))
+HTTP_RETRY_BACKOFF = float(os.environ.get('HTTP_RETRY_BACKOFF', '0.3'))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    # gzip/deflate always, br as well when a brotli decoder is installed
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Connection': 'keep-alive',
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'requests': 0,
+    'connections_opened': 0,
+}
+
+
+def _count(key):
+    with _stats_lock:
+        _stats[key] += 1
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        # DNS lookup and TCP handshake
+        with metrics.stage('connect'):
+            super().connect()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        # DNS lookup, TCP handshake and TLS negotiation
+        with metrics.stage('connect'):
+            super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+    def _new_conn(self):
+        _count('connections_opened')
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+    def _new_conn(self):
+        _count('connections_opened')
+        return super()._new_conn()
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that records how many connections were opened versus reused,
+    and the latency and status of every request per upstream host
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        _count('requests')
+        host = urlparse(request.url).netloc.lower()
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            return response
+        finally:
+            metrics.observe_upstream(host, status, time.perf_counter() - started)
+
+
+def _build_session():
+    # Every request is sent once: mirrors.get retries, so each retry waits
+    # for the outbound scheduler and a Retry-After never blocks a pool thread
+    retry = Retry(
+        total=0,
+        status_forcelist=(),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+session = _build_session()
+
+
+def get(url, **kwargs):
+    """
+    GET a URL through the shared session with the default timeouts
+    """
+    kwargs.setdefault('timeout', (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    return session.get(url, **kwargs)
+
+
+def pool_stats():
+    """
+    Return connection pool usage counters
+    """
+    with _stats_lock:
+        requests_sent = _stats['requests']
+        opened = _stats['connections_opened']
+    return {
+        'requests': requests_sent,
+        'connections_opened': opened,
+        'connections_reused': max(0, requests_sent - opened),
+        'pool_maxsize': HTTP_POOL_MAXSIZE,
+    }
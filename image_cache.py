@@ -0,0 +1,196 @@
+"""
+On-disk poster cache behind the /img proxy.
+
+Posters are fetched from upstream once and kept as files in IMAGE_CACHE_DIR,
+next to a small JSON file with their content type, ETag and fetch time. The
+directory is bounded to IMAGE_CACHE_MAX_BYTES: a file's mtime is bumped on
+every hit, and once the total size goes over the limit the least recently
+used files are deleted. Workers pointing at the same directory share it.
+
+Proxy URLs carry an HMAC of the upstream URL, so the proxy only fetches the
+images the API handed out. The key is IMAGE_PROXY_SECRET, or one generated
+on first use and kept in the cache directory for every worker to read.
+"""
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import uuid
+
+IMAGE_CACHE_DIR = os.environ.get('IMAGE_CACHE_DIR', 'image_cache')
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+IMAGE_MAX_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', str(5 * 1024 * 1024)))
+IMAGE_PROXY_SECRET = os.environ.get('IMAGE_PROXY_SECRET', '')
+
+# Eviction frees space down to this share of the limit, so it does not run
+# again on the very next store
+EVICT_TO = 0.9
+
+SECRET_FILE = '.secret'
+
+
+class StoredImage:
+    """
+    A cached image: an open file plus what is needed to answer conditional requests
+    """
+
+    def __init__(self, file, content_type, size, etag, fetched_at):
+        self.file = file
+        self.content_type = content_type
+        self.size = size
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class ImageCache:
+    """
+    Size-bounded LRU of images in a directory, keyed by upstream URL
+    """
+
+    def __init__(self, directory=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_MAX_BYTES, secret=IMAGE_PROXY_SECRET):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._secret = (secret or self._load_secret()).encode()
+        self._lock = threading.Lock()
+        self._total = self._scan_total()
+        self._stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _load_secret(self):
+        """
+        Read the signing key of the directory, creating it if this is the first worker
+        """
+        path = os.path.join(self.directory, SECRET_FILE)
+        tmp = f'{path}.{uuid.uuid4().hex}'
+        with open(tmp, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            # link() fails when another worker created the key first
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+        with open(path) as f:
+            return f.read().strip()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.img', base + '.json'
+
+    def _entries(self):
+        """
+        Yield (mtime, size, image path) of every cached image
+        """
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.img'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _scan_total(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def sign(self, url):
+        return hmac.new(self._secret, url.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def verify(self, url, signature):
+        return bool(url) and hmac.compare_digest(self.sign(url), signature or '')
+
+    def contains(self, url):
+        return os.path.exists(self._paths(url)[1])
+
+    def get(self, url, count=True):
+        """
+        Open the cached image of url and mark it as recently used, None on a
+        miss. count=False leaves the lookup out of the hit and miss counters.
+        """
+        image_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            file = open(image_path, 'rb')
+        except (FileNotFoundError, ValueError):
+            if count:
+                self._count('misses')
+            return None
+
+        try:
+            os.utime(image_path)
+        except FileNotFoundError:
+            # Evicted after we opened it, the open file stays readable
+            pass
+        if count:
+            self._count('hits')
+        return StoredImage(file, meta['content_type'], meta['size'], meta['etag'], meta['fetched_at'])
+
+    def put(self, url, content, content_type):
+        """
+        Store an image, evicting the least recently used ones when the cache is full
+        """
+        image_path, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'content_type': content_type,
+            'size': len(content),
+            'etag': '"%s"' % hashlib.blake2b(content, digest_size=12).hexdigest(),
+            'fetched_at': time.time(),
+        }
+        suffix = '.' + uuid.uuid4().hex
+        with open(image_path + suffix, 'wb') as f:
+            f.write(content)
+        with open(meta_path + suffix, 'w') as f:
+            json.dump(meta, f)
+        # The image goes in first, so a reader never finds metadata without it
+        os.replace(image_path + suffix, image_path)
+        os.replace(meta_path + suffix, meta_path)
+
+        with self._lock:
+            self._stats['stores'] += 1
+            self._total += len(content)
+            full = self._total > self.max_bytes
+        if full:
+            self.evict()
+
+    def evict(self):
+        """
+        Delete least recently used images until the cache is under its limit.
+        The directory is rescanned, as other workers add images too.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICT_TO
+        evicted = 0
+        for _, size, image_path in entries:
+            if total <= target:
+                break
+            for path in (image_path[:-len('.img')] + '.json', image_path):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+
+        with self._lock:
+            self._total = total
+            self._stats['evictions'] += evicted
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['bytes'] = self._total
+        stats['max_bytes'] = self.max_bytes
+        return stats
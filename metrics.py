@@ -0,0 +1,256 @@
+"""
+Process-local metrics and per-request stage timings.
+
+Counters and histograms are kept in memory and rendered in the Prometheus
+text exposition format by GET /metrics. Every instrumented stage (connection
+setup, upstream response, HTML parsing, outbound queueing, rate budget waits)
+is observed into scraper_stage_seconds and, when it runs on behalf of an API
+request, added to that request's Timings so the response can carry a
+Server-Timing header. Timings follow the request into fetch pool threads and
+asyncio tasks through a context variable.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """
+    Cumulative bucket histogram with optional labels
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][index] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: dict(entry, buckets=list(entry['buckets'])) for key, entry in self._values.items()}
+        for key, entry in sorted(values.items()):
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry['buckets']):
+                cumulative += count
+                yield self.name + '_bucket', labels + (('le', _format_value(bound)),), cumulative
+            yield self.name + '_bucket', labels + (('le', '+Inf'),), entry['count']
+            yield self.name + '_sum', labels, entry['sum']
+            yield self.name + '_count', labels, entry['count']
+
+
+class Registry:
+    """
+    Collection of metrics plus collectors that report values computed on demand
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collect):
+        """
+        collect() returns (name, type, documentation, [(labels dict, value), ...]) tuples
+        """
+        self._collectors.append(collect)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+
+        for collect in self._collectors:
+            for name, metric_type, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {metric_type}')
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f'{name}{_format_labels(sorted(labels.items()))} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+stage_seconds = registry.histogram(
+    'scraper_stage_seconds', 'Time spent per scraper stage', ['stage']
+)
+upstream_request_seconds = registry.histogram(
+    'scraper_upstream_request_seconds', 'Upstream request latency including retries', ['host']
+)
+upstream_responses = registry.counter(
+    'scraper_upstream_responses_total', 'Upstream responses by status code, "error" when no response arrived',
+    ['host', 'status']
+)
+api_request_seconds = registry.histogram(
+    'scraper_api_request_seconds', 'API request handling time', ['endpoint']
+)
+api_responses = registry.counter(
+    'scraper_api_responses_total', 'API responses by status code', ['endpoint', 'status']
+)
+scheduler_wait_seconds = registry.histogram(
+    'scraper_scheduler_wait_seconds', 'Time upstream requests waited for the outbound scheduler', ['priority']
+)
+
+
+class Timings:
+    """
+    Stage durations accumulated for one API request. Stages running
+    concurrently (player pages are fetched in parallel) add up, so a stage
+    total can exceed the wall clock time of the request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            total, count = self._stages.get(stage, (0.0, 0))
+            self._stages[stage] = (total + seconds, count + 1)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        """
+        Format the stages as a Server-Timing header value
+        """
+        with self._lock:
+            stages = dict(self._stages)
+        entries = [
+            f'{stage};dur={total * 1000:.1f};desc="{count}x"'
+            for stage, (total, count) in stages.items()
+        ]
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+_current_timings = contextvars.ContextVar('timings', default=None)
+
+
+def start_timings():
+    """
+    Start collecting stage timings for the current request
+    """
+    timings = Timings()
+    _current_timings.set(timings)
+    return timings
+
+
+def finish_timings():
+    _current_timings.set(None)
+
+
+def record_stage(stage, seconds):
+    stage_seconds.observe(seconds, stage=stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def stage(name):
+    """
+    Time the enclosed block as one occurrence of a scraper stage
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def observe_upstream(host, status, seconds):
+    upstream_request_seconds.observe(seconds, host=host)
+    upstream_responses.inc(host=host, status=status)
+
+
+def run_in_context(fn, *args):
+    """
+    Return a callable running fn(*args) in a copy of the caller's context, so
+    work handed to a thread pool is still attributed to the current request
+    """
+    context = contextvars.copy_context()
+    return lambda: context.run(fn, *args)
@@ -0,0 +1,383 @@
+"""
+Mirror-aware routing for the upstream site.
+
+The site is served by several interchangeable mirrors (UPSTREAM_MIRRORS). Any
+request for a page on one of them is routed to the fastest healthy mirror,
+judged by a moving average of recent response times. Every mirror has a
+circuit breaker: after MIRROR_FAILURE_THRESHOLD consecutive failures it is
+skipped for MIRROR_RESET_TIMEOUT seconds, then one trial request decides
+whether it is healthy again. A failed request fails over to the next mirror,
+and up to HTTP_RETRIES more attempts go round the mirrors again with backoff.
+Every attempt waits for its own outbound scheduler token.
+
+With MIRROR_HEDGE_ENABLED=1 a request that is still running after the
+mirror's MIRROR_HEDGE_PERCENTILE latency is duplicated to the next mirror and
+whichever answers first wins.
+
+Pages fetched from any mirror have the other mirror hostnames rewritten to the
+canonical (first) mirror, so URLs in API results and cache keys are the same
+no matter which mirror served them.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+import http_client
+import metrics
+from scheduler import scheduler
+
+UPSTREAM_MIRRORS = [
+    host.strip().lower()
+    for host in os.environ.get('UPSTREAM_MIRRORS', 'new17.ngefilm.site,new18.ngefilm.site').split(',')
+    if host.strip()
+]
+# Scheme used for URLs built from the canonical mirror (http for a local test origin)
+UPSTREAM_SCHEME = os.environ.get('UPSTREAM_SCHEME', 'https')
+MIRROR_FAILURE_THRESHOLD = int(os.environ.get('MIRROR_FAILURE_THRESHOLD', '3'))
+MIRROR_RESET_TIMEOUT = float(os.environ.get('MIRROR_RESET_TIMEOUT', '30'))
+MIRROR_HEDGE_ENABLED = os.environ.get('MIRROR_HEDGE_ENABLED', '0') == '1'
+MIRROR_HEDGE_PERCENTILE = float(os.environ.get('MIRROR_HEDGE_PERCENTILE', '95'))
+MIRROR_HEDGE_MIN_DELAY = float(os.environ.get('MIRROR_HEDGE_MIN_DELAY', '0.5'))
+MIRROR_HEDGE_WORKERS = int(os.environ.get('MIRROR_HEDGE_WORKERS', '32'))
+
+# Responses that say more about the mirror than about the page
+FAILOVER_STATUSES = (429, 500, 502, 503, 504)
+
+# Latency samples kept per mirror, and how many are needed before hedging
+LATENCY_WINDOW = 100
+HEDGE_MIN_SAMPLES = 10
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: closed, open after failure_threshold consecutive
+    failures, half-open (one trial request) after reset_timeout seconds
+    """
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started = None
+
+    def allow(self, now):
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and now - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+            self._trial_started = None
+        # A trial that never reported back (e.g. a routed mirror that was not
+        # needed after all) is given up after another reset_timeout
+        if self.state == 'half_open' and (self._trial_started is None or now - self._trial_started >= self.reset_timeout):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._trial_started = None
+
+    def record_failure(self, now):
+        self.failures += 1
+        self._trial_started = None
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self.opened_at = now
+
+
+class Mirror:
+    """
+    Health and latency bookkeeping for one mirror host
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.breaker = CircuitBreaker(MIRROR_FAILURE_THRESHOLD, MIRROR_RESET_TIMEOUT)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.average = None
+        self.requests = 0
+        self.failures = 0
+        self.hedges = 0
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+        # Exponentially weighted so a mirror that slows down loses its rank quickly
+        self.average = seconds if self.average is None else 0.7 * self.average + 0.3 * seconds
+
+    def percentile(self, percent):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percent / 100))
+        return ordered[index]
+
+
+class MirrorPool:
+    """
+    Routes requests for mirrored pages to the fastest healthy mirror
+    """
+
+    def __init__(self, hosts):
+        self.hosts = list(hosts)
+        self.canonical_host = self.hosts[0] if self.hosts else None
+        self._mirrors = {host: Mirror(host) for host in self.hosts}
+        self._lock = threading.Lock()
+        self._rewrites = [
+            (('//' + host).encode(), ('//' + self.canonical_host).encode())
+            for host in self.hosts[1:]
+        ]
+
+    @property
+    def base_url(self):
+        return f"{UPSTREAM_SCHEME}://{self.canonical_host}"
+
+    def is_mirror(self, url):
+        return urlsplit(url).netloc.lower() in self._mirrors
+
+    def site(self, url):
+        """
+        Rate limiting key of a URL: the canonical host for every mirror
+        """
+        host = urlsplit(url).netloc.lower()
+        return self.canonical_host if host in self._mirrors else host
+
+    def canonical_url(self, url):
+        """
+        Rewrite a URL on any mirror to the canonical mirror
+        """
+        parts = urlsplit(url)
+        if parts.netloc.lower() not in self._mirrors:
+            return url
+        return urlunsplit((parts.scheme or UPSTREAM_SCHEME, self.canonical_host, parts.path, parts.query, parts.fragment))
+
+    def rewrite_content(self, content):
+        """
+        Point links to other mirrors inside a fetched page at the canonical mirror
+        """
+        for old, new in self._rewrites:
+            content = content.replace(old, new)
+        return content
+
+    def route(self, url):
+        """
+        Return the URLs to try for url, best mirror first, or None when url is
+        not on a mirror. Mirrors with an open breaker are left out unless every
+        mirror is open, then all of them are tried anyway.
+        """
+        parts = urlsplit(url)
+        if parts.netloc.lower() not in self._mirrors:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            healthy = [mirror for mirror in self._mirrors.values() if mirror.breaker.allow(now)]
+            # Mirrors without samples sort first so every mirror gets measured
+            healthy.sort(key=lambda mirror: mirror.average or 0.0)
+            ordered = healthy or list(self._mirrors.values())
+        return [
+            urlunsplit((parts.scheme, mirror.host, parts.path, parts.query, parts.fragment))
+            for mirror in ordered
+        ]
+
+    def record_success(self, host, seconds):
+        with self._lock:
+            mirror = self._mirrors.get(host)
+            if mirror is not None:
+                mirror.requests += 1
+                mirror.record_latency(seconds)
+                mirror.breaker.record_success()
+
+    def record_failure(self, host):
+        with self._lock:
+            mirror = self._mirrors.get(host)
+            if mirror is not None:
+                mirror.requests += 1
+                mirror.failures += 1
+                mirror.breaker.record_failure(time.monotonic())
+
+    def record_hedge(self, host):
+        with self._lock:
+            mirror = self._mirrors.get(host)
+            if mirror is not None:
+                mirror.hedges += 1
+
+    def hedge_delay(self, host):
+        """
+        Seconds to wait on host before hedging, None when hedging is off or
+        there are not enough samples yet
+        """
+        if not MIRROR_HEDGE_ENABLED:
+            return None
+        with self._lock:
+            mirror = self._mirrors.get(host)
+            if mirror is None or len(mirror.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return max(MIRROR_HEDGE_MIN_DELAY, mirror.percentile(MIRROR_HEDGE_PERCENTILE))
+
+    def stats(self):
+        with self._lock:
+            return {
+                'canonical_host': self.canonical_host,
+                'hedging': MIRROR_HEDGE_ENABLED,
+                'mirrors': [
+                    {
+                        'host': mirror.host,
+                        'state': mirror.breaker.state,
+                        'average_ms': None if mirror.average is None else round(mirror.average * 1000, 1),
+                        'p95_ms': None if not mirror.latencies else round(mirror.percentile(95) * 1000, 1),
+                        'requests': mirror.requests,
+                        'failures': mirror.failures,
+                        'hedges': mirror.hedges,
+                    }
+                    for mirror in self._mirrors.values()
+                ],
+            }
+
+
+mirror_pool = MirrorPool(UPSTREAM_MIRRORS)
+
+# Hedged requests run their attempts on these threads. An attempt is only
+# handed to one that is free, so it never queues and the hedge timer only
+# counts time spent on upstream; with every thread busy requests go unhedged
+_hedge_executor = ThreadPoolExecutor(max_workers=MIRROR_HEDGE_WORKERS, thread_name_prefix='hedge')
+_hedge_slots = threading.BoundedSemaphore(MIRROR_HEDGE_WORKERS)
+
+
+def _attempt(url, kwargs):
+    """
+    One request to one mirror, returns (response, ok)
+    """
+    host = urlsplit(url).netloc.lower()
+    started = time.perf_counter()
+    try:
+        response = http_client.get(url, **kwargs)
+    except requests.RequestException:
+        mirror_pool.record_failure(host)
+        raise
+
+    if response.status_code in FAILOVER_STATUSES:
+        mirror_pool.record_failure(host)
+        return response, False
+    mirror_pool.record_success(host, time.perf_counter() - started)
+    return response, True
+
+
+def _attempt_now(url, kwargs):
+    """
+    Run an attempt on the calling thread, returns a completed Future
+    """
+    future = Future()
+    try:
+        future.set_result(_attempt(url, kwargs))
+    except requests.RequestException as e:
+        future.set_exception(e)
+    return future
+
+
+def attempt_urls(url):
+    """
+    URLs to send the attempts for url to: every routed mirror once, best
+    first, then HTTP_RETRIES retries going round them again. A URL that is
+    not on a mirror is just retried.
+    """
+    mirror_urls = mirror_pool.route(url) or [url]
+    count = len(mirror_urls) + http_client.HTTP_RETRIES
+    return [mirror_urls[n % len(mirror_urls)] for n in range(count)]
+
+
+def retry_delay(retry):
+    """
+    Exponential backoff before sending a URL that already failed again
+    """
+    return http_client.HTTP_RETRY_BACKOFF * (2 ** retry)
+
+
+def _start_attempt(url, kwargs):
+    """
+    Run an attempt on a hedge thread whose slot the caller took, returns its
+    Future once the attempt is running
+    """
+    started = threading.Event()
+
+    def run():
+        started.set()
+        try:
+            return _attempt(url, kwargs)
+        finally:
+            _hedge_slots.release()
+
+    future = _hedge_executor.submit(metrics.run_in_context(run))
+    started.wait()
+    return future
+
+
+def _discard(future):
+    """
+    Release the response of an attempt that lost the race
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result()[0].close()
+
+
+def get(url, **kwargs):
+    """
+    GET a URL through the pooled HTTP client, routing mirrored pages to the
+    best mirror with failover and retries (and hedging when enabled). Every
+    attempt, retries included, is sent once the outbound scheduler allows it.
+    """
+    attempts = attempt_urls(url)
+    tried = set()
+    retries = 0
+    last_response, last_error = None, None
+    while attempts:
+        primary = attempts.pop(0)
+        if primary in tried:
+            time.sleep(retry_delay(retries))
+            retries += 1
+        tried.add(primary)
+        # Taken before the hedge timer starts, so queueing does not trigger a hedge
+        scheduler.acquire(mirror_pool.site(primary))
+        delay = None
+        if attempts and attempts[0] != primary:
+            delay = mirror_pool.hedge_delay(urlsplit(primary).netloc.lower())
+        if delay is not None and _hedge_slots.acquire(blocking=False):
+            futures = [_start_attempt(primary, kwargs)]
+            done, _ = wait(futures, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done and _hedge_slots.acquire(blocking=False):
+                hedge = attempts.pop(0)
+                tried.add(hedge)
+                mirror_pool.record_hedge(urlsplit(hedge).netloc.lower())
+                scheduler.acquire(mirror_pool.site(hedge))
+                futures.append(_start_attempt(hedge, kwargs))
+        else:
+            futures = [_attempt_now(primary, kwargs)]
+
+        for future in as_completed(futures):
+            try:
+                response, ok = future.result()
+            except requests.RequestException as e:
+                last_error = e
+                continue
+            if ok:
+                # A losing hedge keeps running in the background, its
+                # response is released when it finishes
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(_discard)
+                return response
+            if last_response is not None:
+                # Only the last failed response is returned, release the others
+                last_response.close()
+            last_response = response
+
+    if last_response is not None:
+        return last_response
+    raise last_error
@@ -0,0 +1,172 @@
+"""
+Page fetch layer on top of the pooled HTTP client.
+
+Pages are remembered together with their ETag/Last-Modified validators, so a
+repeat fetch sends If-None-Match/If-Modified-Since and a 304 answer reuses the
+stored body and whatever was already parsed out of it. Within one extraction
+a FetchContext makes sure every distinct URL is only fetched once.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import metrics
+import mirrors
+from cache import normalize_url
+from mirrors import mirror_pool
+from scheduler import scheduler, prepaid
+
+PAGE_STORE_MAX_ENTRIES = int(os.environ.get('PAGE_STORE_MAX_ENTRIES', '256'))
+
+
+class Page:
+    """
+    A fetched upstream page and the documents parsed from it
+    """
+
+    def __init__(self, url, content, etag=None, last_modified=None):
+        self.url = url
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self._parsed = {}
+
+    def parsed(self, kind, parse_fn):
+        """
+        Return parse_fn(content), computed once per page and kind
+        """
+        if kind not in self._parsed:
+            with metrics.stage('parse'):
+                self._parsed[kind] = parse_fn(self.content)
+        return self._parsed[kind]
+
+
+class PageStore:
+    """
+    LRU store of pages that carry cache validators
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'fetches': 0, 'conditional_requests': 0, 'not_modified': 0, 'bytes_saved': 0}
+
+    def get(self, key):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, key, page):
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._pages)
+        return stats
+
+
+page_store = PageStore(PAGE_STORE_MAX_ENTRIES)
+
+
+def fetch_page(url):
+    """
+    Fetch a page, revalidating a stored copy with a conditional request.
+    Pages on a mirror are fetched from the best mirror and keyed by their
+    canonical URL.
+    """
+    url = mirror_pool.canonical_url(url)
+    key = normalize_url(url)
+    stored = page_store.get(key)
+    headers = {}
+    if stored is not None:
+        if stored.etag:
+            headers['If-None-Match'] = stored.etag
+        if stored.last_modified:
+            headers['If-Modified-Since'] = stored.last_modified
+
+    page_store.count('fetches')
+    if headers:
+        page_store.count('conditional_requests')
+    with metrics.stage('upstream'):
+        response = mirrors.get(url, headers=headers)
+
+    if response.status_code == 304 and stored is not None:
+        # Not modified: no body was transferred and nothing needs re-parsing
+        page_store.count('not_modified')
+        page_store.count('bytes_saved', len(stored.content))
+        return stored
+
+    response.raise_for_status()
+    content = response.content
+    if mirror_pool.is_mirror(url):
+        content = mirror_pool.rewrite_content(content)
+    page = Page(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    if page.etag or page.last_modified:
+        page_store.put(key, page)
+    return page
+
+
+class FetchContext:
+    """
+    De-duplicates page fetches within one extraction: every distinct URL is
+    fetched once, concurrent callers wait on the same fetch. An optional
+    budget (a TokenBucket) is charged one token per upstream request.
+
+    URLs handed to the fetch pool are admitted first, on the calling thread:
+    the budget and the scheduler token are taken before a pool thread is,
+    and the pool thread's fetch then goes out without waiting.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self._pages = {}
+        self._admitted = {}
+        self._lock = threading.Lock()
+
+    def admit(self, url):
+        """
+        Wait until a fetch of url may be sent. Does nothing when url was
+        already fetched or admitted in this context.
+        """
+        key = normalize_url(url)
+        with self._lock:
+            if key in self._pages or key in self._admitted:
+                return
+        if self.budget is not None:
+            metrics.record_stage('budget', self.budget.acquire())
+        site = mirror_pool.site(mirror_pool.canonical_url(url))
+        scheduler.acquire(site)
+        with self._lock:
+            self._admitted[key] = site
+
+    def get(self, url):
+        key = normalize_url(url)
+        with self._lock:
+            future = self._pages.get(key)
+            owner = future is None
+            if owner:
+                future = self._pages[key] = Future()
+            site = self._admitted.pop(key, None)
+
+        if owner:
+            try:
+                if site is None and self.budget is not None:
+                    metrics.record_stage('budget', self.budget.acquire())
+                with prepaid(site):
+                    future.set_result(fetch_page(url))
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
@@ -0,0 +1,143 @@
+"""
+HTML parsing layer for the scraper.
+
+Pages are parsed with lxml when it is installed (html.parser otherwise) and
+only the subtrees an extractor actually reads are built, using SoupStrainers.
+Player pages first go through a bounded regex fast path that pulls the iframe
+URL straight out of the raw bytes and only fall back to parsing when it fails.
+"""
+import html
+import os
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    _DEFAULT_PARSER = 'lxml'
+except ImportError:
+    _DEFAULT_PARSER = 'html.parser'
+
+# Set HTML_PARSER=html.parser to force the pure Python parser
+HTML_PARSER = os.environ.get('HTML_PARSER', _DEFAULT_PARSER)
+
+
+def _has_class(attrs, class_name):
+    return class_name in (attrs.get('class') or '').split()
+
+
+def _content_page_tags(name, attrs):
+    # Title, movie server tabs, series episode list and loose episode links
+    if name == 'h1':
+        return _has_class(attrs, 'entry-title')
+    if name == 'ul':
+        return _has_class(attrs, 'muvipro-player-tabs')
+    if name == 'div':
+        return _has_class(attrs, 'gmr-listseries')
+    if name == 'a':
+        return '/eps/' in (attrs.get('href') or '')
+    return False
+
+
+def _latest_page_tags(name, attrs):
+    # "Upload Terbaru" heading and the main grid of latest items
+    if name == 'h3':
+        return _has_class(attrs, 'homemodule-title')
+    if name == 'div':
+        return attrs.get('id') == 'gmr-main-load'
+    return False
+
+
+CONTENT_PAGE_STRAINER = SoupStrainer(_content_page_tags)
+LATEST_PAGE_STRAINER = SoupStrainer(_latest_page_tags)
+# Result articles, plus every link for the fallback scan
+SEARCH_PAGE_STRAINER = SoupStrainer(['article', 'a'])
+PLAYER_PAGE_STRAINER = SoupStrainer('iframe')
+
+
+def parse(markup, strainer=None):
+    """
+    Parse markup with the configured backend, optionally restricted by a strainer
+    """
+    return BeautifulSoup(markup, HTML_PARSER, parse_only=strainer)
+
+
+def parse_content_page(markup):
+    """
+    Parse a movie or series page
+    """
+    return parse(markup, CONTENT_PAGE_STRAINER)
+
+
+def parse_latest_page(markup):
+    """
+    Parse the home page with the latest uploads grid
+    """
+    return parse(markup, LATEST_PAGE_STRAINER)
+
+
+def parse_search_page(markup):
+    """
+    Parse a search results page
+    """
+    return parse(markup, SEARCH_PAGE_STRAINER)
+
+
+# An <iframe ...> tag, with a bounded attribute section
+_FAST_PATH_MAX_CANDIDATES = 8
+_IFRAME_TAG_RE = re.compile(rb'<iframe\b([^>]{0,4096})>', re.IGNORECASE)
+_IFRAME_ATTR_RE = re.compile(
+    rb'''(?:^|\s)(data-litespeed-src|src)\s*=\s*(?:"([^"]{0,4096})"|'([^']{0,4096})'|([^\s"'>]{1,4096}))''',
+    re.IGNORECASE
+)
+
+
+def _inside_raw_block(markup, position):
+    # A match inside a <script> or an HTML comment is not a real iframe
+    prefix = markup[:position].lower()
+    return (prefix.count(b'<script') != prefix.count(b'</script')
+            or prefix.count(b'<!--') != prefix.count(b'-->'))
+
+
+def _iframe_url_fast(markup):
+    """
+    Pull the first iframe URL out of raw bytes, returns None when unsure
+    """
+    for candidate, match in enumerate(_IFRAME_TAG_RE.finditer(markup)):
+        if candidate >= _FAST_PATH_MAX_CANDIDATES:
+            return None
+        if not _inside_raw_block(markup, match.start()):
+            break
+    else:
+        return None
+
+    attributes = {}
+    for attr in _IFRAME_ATTR_RE.finditer(match.group(1)):
+        name = attr.group(1).lower().decode('ascii')
+        value = attr.group(2) or attr.group(3) or attr.group(4) or b''
+        attributes.setdefault(name, html.unescape(value.decode('utf-8', 'replace')))
+
+    return attributes.get('data-litespeed-src') or attributes.get('src') or ''
+
+
+def _iframe_url_parsed(markup):
+    iframe = parse(markup, PLAYER_PAGE_STRAINER).find('iframe')
+    if not iframe:
+        return ''
+    return iframe.get('data-litespeed-src') or iframe.get('src') or ''
+
+
+def extract_iframe_url(markup):
+    """
+    Return the player iframe URL of a player page, or "" when there is none
+    """
+    if isinstance(markup, str):
+        markup = markup.encode('utf-8')
+
+    iframe_url = _iframe_url_fast(markup)
+    if iframe_url is None:
+        iframe_url = _iframe_url_parsed(markup)
+
+    if iframe_url == 'about:blank':
+        iframe_url = ''
+    return iframe_url
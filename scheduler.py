@@ -0,0 +1,222 @@
+"""
+Outbound request scheduler.
+
+Every upstream request waits for a token from the bucket of its site before
+it is sent, so the aggregate request rate to a site stays at UPSTREAM_RATE
+per second (bursts of UPSTREAM_BURST) no matter how many extractions run at
+once. All mirrors of the upstream site share one bucket.
+
+Requests waiting for a token are served by priority, first come first served
+within a priority: interactive API requests first, then batch extractions,
+then background work (episode prefetching, cache warming). The priority of
+the current request is a context variable, so it follows the work into fetch
+pool threads and asyncio tasks like the request timings do.
+
+Work fanned out over the fetch pool takes its token before it is submitted
+(see FetchContext.admit), on the thread of the request it belongs to, and
+async fetches take theirs before their per-host slot (AsyncScraper.fetch_page).
+Only requests that may go right away occupy pool threads and per-host slots, so
+queued background work cannot hold them while an interactive request waits
+behind it where the scheduler does not see it.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from fetch_pool import TokenBucket
+
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', '10'))
+UPSTREAM_BURST = float(os.environ.get('UPSTREAM_BURST', '20'))
+
+# Highest priority first
+PRIORITIES = ('interactive', 'batch', 'background')
+
+# How often asyncio waiters that are not first in line look again
+ASYNC_POLL_INTERVAL = 0.02
+
+_current_priority = contextvars.ContextVar('priority', default='interactive')
+# Hosts whose next request in this context uses a token acquired beforehand
+_prepaid = contextvars.ContextVar('prepaid', default=None)
+
+
+def current_priority():
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(name):
+    """
+    Run the block's upstream requests at the given priority
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {name}")
+    token = _current_priority.set(name)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+@contextmanager
+def prepaid(host):
+    """
+    Let the block's first request to host use a token that was already
+    acquired for it. host None leaves every request to the scheduler.
+    """
+    token = _prepaid.set([host] if host is not None else None)
+    try:
+        yield
+    finally:
+        _prepaid.reset(token)
+
+
+def _take_prepaid(host):
+    hosts = _prepaid.get()
+    if hosts and host in hosts:
+        hosts.remove(host)
+        return True
+    return False
+
+
+class HostQueue:
+    """
+    Token bucket and waiting requests of one upstream site
+    """
+
+    def __init__(self, rate, burst):
+        self.bucket = TokenBucket(rate, burst)
+        self.condition = threading.Condition()
+        # Heap of (priority rank, arrival number, priority name)
+        self.waiters = []
+
+
+class OutboundScheduler:
+    """
+    Grants upstream requests one token at a time, per site and in priority order
+    """
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._arrivals = itertools.count()
+        self._granted = {name: 0 for name in PRIORITIES}
+
+    def _queue(self, host):
+        with self._lock:
+            queue = self._queues.get(host)
+            if queue is None:
+                queue = self._queues[host] = HostQueue(self.rate, self.burst)
+            return queue
+
+    def _enter(self, host, name):
+        if name is None:
+            name = current_priority()
+        queue = self._queue(host)
+        entry = (PRIORITIES.index(name), next(self._arrivals), name)
+        with queue.condition:
+            heapq.heappush(queue.waiters, entry)
+        return queue, entry
+
+    def _try_grant(self, queue, entry):
+        """
+        Hand a token to entry if it is first in line, called with the queue's
+        condition held. Returns 0 when granted, otherwise the seconds until
+        the next token (None when entry is not first in line).
+        """
+        if queue.waiters[0] != entry:
+            return None
+        delay = queue.bucket.try_acquire()
+        if delay == 0:
+            heapq.heappop(queue.waiters)
+            # The next in line may be able to go as well
+            queue.condition.notify_all()
+        return delay
+
+    def _leave(self, queue, entry):
+        with queue.condition:
+            queue.waiters.remove(entry)
+            heapq.heapify(queue.waiters)
+            queue.condition.notify_all()
+
+    def _granted_after(self, name, started):
+        waited = time.perf_counter() - started
+        with self._lock:
+            self._granted[name] += 1
+        metrics.scheduler_wait_seconds.observe(waited, priority=name)
+        metrics.record_stage('queue', waited)
+        return waited
+
+    def acquire(self, host, name=None):
+        """
+        Block until a request to host may be sent, returns the time waited
+        """
+        if _take_prepaid(host):
+            return 0.0
+        started = time.perf_counter()
+        queue, entry = self._enter(host, name)
+        try:
+            with queue.condition:
+                while True:
+                    delay = self._try_grant(queue, entry)
+                    if delay == 0:
+                        break
+                    queue.condition.wait(delay)
+        except BaseException:
+            self._leave(queue, entry)
+            raise
+        return self._granted_after(entry[2], started)
+
+    async def acquire_async(self, host, name=None):
+        """
+        Like acquire() without blocking the event loop
+        """
+        if _take_prepaid(host):
+            return 0.0
+        started = time.perf_counter()
+        queue, entry = self._enter(host, name)
+        try:
+            while True:
+                with queue.condition:
+                    delay = self._try_grant(queue, entry)
+                if delay == 0:
+                    break
+                await asyncio.sleep(ASYNC_POLL_INTERVAL if delay is None else delay)
+        except BaseException:
+            self._leave(queue, entry)
+            raise
+        return self._granted_after(entry[2], started)
+
+    def queue_depths(self):
+        """
+        Return {(host, priority): waiting requests}
+        """
+        with self._lock:
+            queues = dict(self._queues)
+        depths = {}
+        for host, queue in queues.items():
+            with queue.condition:
+                waiting = [entry[2] for entry in queue.waiters]
+            for name in PRIORITIES:
+                depths[(host, name)] = waiting.count(name)
+        return depths
+
+    def stats(self):
+        with self._lock:
+            granted = dict(self._granted)
+            queues = dict(self._queues)
+        hosts = {}
+        for (host, name), depth in self.queue_depths().items():
+            hosts.setdefault(host, {'queued': {}, 'tokens': round(queues[host].bucket.available(), 2)})
+            hosts[host]['queued'][name] = depth
+        return {'rate': self.rate, 'burst': self.burst, 'granted': granted, 'hosts': hosts}
+
+
+scheduler = OutboundScheduler()
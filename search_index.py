@@ -0,0 +1,262 @@
+"""
+Local inverted search index over titles seen by the scraper.
+
+Titles from the latest uploads, upstream search results and extractions are
+indexed in memory so common queries are answered without a round-trip to the
+upstream search page. Matching is per token: exact, prefix (for the last
+query token, so results show up while typing) and typo tolerant via a
+deletion-neighbourhood index (one edit for short words, two for long ones).
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Content type filter values accepted by /api/search and the result types they match
+TYPE_FILTERS = {
+    'movie': {'Movie'},
+    'post': {'Movie'},
+    'tv': {'Series', 'Episode'},
+}
+
+_MATCH_SCORES = {'exact': 3, 'prefix': 2, 'fuzzy': 1}
+_MATCH_KINDS = {score: kind for kind, score in _MATCH_SCORES.items()}
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _max_edits(token):
+    if len(token) >= 8:
+        return 2
+    if len(token) >= 4:
+        return 1
+    return 0
+
+
+def _deletes(token, edits):
+    """
+    All strings reachable from token by deleting up to edits characters
+    """
+    variants = {token}
+    frontier = {token}
+    for _ in range(edits):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def _edit_distance(a, b, limit):
+    """
+    Damerau-Levenshtein distance, or limit + 1 once it is known to exceed limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class SearchIndex:
+    """
+    Thread-safe in-memory inverted index of content items keyed by URL
+    """
+
+    def __init__(self, max_documents=5000, query_ttl=3600):
+        self.max_documents = max_documents
+        self.query_ttl = query_ttl
+        self._lock = threading.RLock()
+        self._documents = OrderedDict()
+        self._postings = {}
+        self._deletions = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+        self._upstream_queries = OrderedDict()
+        self._stats = {'queries': 0, 'answered': 0, 'upstream': 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._documents)
+
+    def add(self, item):
+        """
+        Add or update a content item (a dict with at least title and url)
+        """
+        url = item.get('url')
+        title = item.get('title')
+        if not url or not title:
+            return
+
+        with self._lock:
+            existing = self._documents.get(url)
+            if existing is not None:
+                # Never replace known details with empty ones
+                merged = dict(existing)
+                merged.update({key: value for key, value in item.items() if value})
+                if merged.get('title') != existing.get('title'):
+                    self._remove(url)
+                    self._insert(url, merged)
+                else:
+                    self._documents[url] = merged
+                    self._documents.move_to_end(url)
+            else:
+                self._insert(url, dict(item))
+                while len(self._documents) > self.max_documents:
+                    self._remove(next(iter(self._documents)))
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def _insert(self, url, document):
+        self._documents[url] = document
+        for token in set(tokenize(document['title'])):
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                self._vocabulary_dirty = True
+                for variant in _deletes(token, _max_edits(token)):
+                    self._deletions.setdefault(variant, set()).add(token)
+            postings.add(url)
+
+    def _remove(self, url):
+        document = self._documents.pop(url)
+        for token in set(tokenize(document['title'])):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(url)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+                for variant in _deletes(token, _max_edits(token)):
+                    tokens = self._deletions.get(variant)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self._deletions[variant]
+
+    def _prefix_tokens(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        # Binary search for the first vocabulary entry >= prefix
+        low, high = 0, len(self._vocabulary)
+        while low < high:
+            middle = (low + high) // 2
+            if self._vocabulary[middle] < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        tokens = []
+        for token in self._vocabulary[low:]:
+            if not token.startswith(prefix):
+                break
+            tokens.append(token)
+        return tokens
+
+    def _fuzzy_tokens(self, token):
+        edits = _max_edits(token)
+        if not edits:
+            return []
+        candidates = set()
+        for variant in _deletes(token, edits):
+            candidates |= self._deletions.get(variant, set())
+        return [
+            candidate for candidate in candidates
+            if candidate != token and _edit_distance(token, candidate, edits) <= edits
+        ]
+
+    def _match_token(self, token, allow_prefix):
+        """
+        Return {url: score} for the documents matching one query token
+        """
+        scores = {}
+
+        def credit(tokens, kind):
+            for matched in tokens:
+                for url in self._postings.get(matched, ()):
+                    scores[url] = max(scores.get(url, 0), _MATCH_SCORES[kind])
+
+        if token in self._postings:
+            credit([token], 'exact')
+        if allow_prefix:
+            credit(self._prefix_tokens(token), 'prefix')
+        credit(self._fuzzy_tokens(token), 'fuzzy')
+        return scores
+
+    def search(self, query, content_type=None, limit=50):
+        """
+        Return the indexed items matching every token of query, best first.
+        Each item's 'match' is how its weakest token matched: 'exact',
+        'prefix' or 'fuzzy' (a typo).
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        allowed_types = TYPE_FILTERS.get(content_type) if content_type else None
+
+        with self._lock:
+            totals = None
+            for position, token in enumerate(tokens):
+                scores = self._match_token(token, allow_prefix=position == len(tokens) - 1)
+                if totals is None:
+                    totals, weakest = scores, dict(scores)
+                else:
+                    totals = {url: totals[url] + score for url, score in scores.items() if url in totals}
+                    weakest = {url: min(weakest[url], scores[url]) for url in totals}
+                if not totals:
+                    return []
+
+            results = [
+                self._documents[url] for url in totals
+                if allowed_types is None or self._documents[url].get('type') in allowed_types
+            ]
+            results.sort(key=lambda document: (-totals[document['url']], len(document['title']), document['title']))
+            return [
+                dict(document, match=_MATCH_KINDS[weakest[document['url']]])
+                for document in results[:limit]
+            ]
+
+    def query_resolved_upstream(self, query, content_type=None):
+        """
+        Whether this query was sent upstream recently, so the index holds its hits
+        """
+        key = (' '.join(tokenize(query)), content_type or '')
+        with self._lock:
+            resolved_at = self._upstream_queries.get(key)
+            return resolved_at is not None and time.time() - resolved_at < self.query_ttl
+
+    def record_upstream_query(self, query, content_type=None):
+        key = (' '.join(tokenize(query)), content_type or '')
+        with self._lock:
+            self._upstream_queries[key] = time.time()
+            self._upstream_queries.move_to_end(key)
+            while len(self._upstream_queries) > self.max_documents:
+                self._upstream_queries.popitem(last=False)
+
+    def count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['documents'] = len(self._documents)
+            stats['tokens'] = len(self._postings)
+        return stats
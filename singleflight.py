@@ -0,0 +1,220 @@
+"""
+Single-flight coalescing of identical in-flight work.
+
+Concurrent calls for the same key share one computation: the first caller
+(the leader) runs it, everyone arriving while it runs waits for it and gets
+the same result. With a shared store (the sqlite extraction cache backend)
+this also holds across worker processes: the leader takes a lock on the key
+in the store, and a leader in another process waits for that lock instead of
+computing, then picks up the result the lock holder left behind.
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+# Seconds a worker may hold a key before others assume it died and take over
+SINGLEFLIGHT_LOCK_TTL = float(os.environ.get('SINGLEFLIGHT_LOCK_TTL', '60'))
+# Seconds between checks of a lock held by another worker
+SINGLEFLIGHT_POLL_INTERVAL = float(os.environ.get('SINGLEFLIGHT_POLL_INTERVAL', '0.05'))
+
+# Results left in the store only have to outlive the waiters' next poll
+RESULT_TTL = 30
+
+
+class FlightAbandoned(Exception):
+    """
+    The leader stopped before producing a result (e.g. a closed stream);
+    waiters retry instead of failing
+    """
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key, for threads (do) and
+    asyncio tasks (do_async)
+    """
+
+    def __init__(self, store=None, lock_ttl=SINGLEFLIGHT_LOCK_TTL, poll_interval=SINGLEFLIGHT_POLL_INTERVAL):
+        self.store = store
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'coalesced': 0, 'remote_waits': 0, 'remote_results': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _try_lock(self, key):
+        """
+        Take the store lock for key, returns its token or None when another
+        worker holds it
+        """
+        if self.store is None:
+            return True
+        token = uuid.uuid4().hex
+        return token if self.store.lock(key, token, self.lock_ttl) else None
+
+    def _poll(self, key):
+        """
+        One check of a lock held by another worker. Returns (token, None)
+        once the lock is ours, (None, value) once the other worker left a
+        result, or (None, None) while it is still running
+        """
+        locked, value = self.store.lock_state(key)
+        if value is not None:
+            self._count('remote_results')
+            return None, value
+        if not locked:
+            # Released without a result (or expired), take over
+            return self._try_lock(key), None
+        return None, None
+
+    def _claim(self, key):
+        """
+        Returns (token, None) when this worker computes key, or (None, value)
+        with the result of the worker that held it
+        """
+        token = self._try_lock(key)
+        if token is not None:
+            return token, None
+        self._count('remote_waits')
+        while True:
+            time.sleep(self.poll_interval)
+            token, value = self._poll(key)
+            if token is not None or value is not None:
+                return token, value
+
+    async def _claim_async(self, key):
+        token = self._try_lock(key)
+        if token is not None:
+            return token, None
+        self._count('remote_waits')
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            token, value = self._poll(key)
+            if token is not None or value is not None:
+                return token, value
+
+    def _release(self, key, token, value=None, error=None):
+        """
+        Release the store lock, leaving a successful result behind for the
+        workers waiting on it
+        """
+        if self.store is None or token is None:
+            return
+        if error is None:
+            self.store.unlock(key, token, value, RESULT_TTL)
+        else:
+            self.store.unlock(key, token)
+
+    def begin(self, key):
+        """
+        Join the computation of key. Returns (future, leader): the leader
+        computes the value and hands it to finish(), everybody else waits on
+        future. The leader must call finish() in every case.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._stats['coalesced'] += 1
+                return flight[0], False
+            future = Future()
+            flight = self._flights[key] = [future, None]
+            self._stats['leaders'] += 1
+
+        try:
+            token, value = self._claim(key)
+        except Exception as e:
+            self.finish(key, error=e)
+            raise
+        if token is None:
+            # Another worker computed it, hand its result to our waiters
+            self.finish(key, value)
+            return future, False
+        flight[1] = token
+        return future, True
+
+    def finish(self, key, value=None, error=None):
+        with self._lock:
+            future, token = self._flights.pop(key)
+        try:
+            self._release(key, token, value, error)
+        finally:
+            if error is None:
+                future.set_result(value)
+            else:
+                future.set_exception(error)
+
+    def do(self, key, fn):
+        """
+        Run fn() once for all concurrent callers of key. Returns
+        (value, shared), shared telling whether another caller computed it.
+        """
+        while True:
+            future, leader = self.begin(key)
+            if not leader:
+                try:
+                    return future.result(), True
+                except FlightAbandoned:
+                    continue
+
+            try:
+                value = fn()
+            except BaseException as e:
+                self.finish(key, error=e if isinstance(e, Exception) else FlightAbandoned(key))
+                raise
+            self.finish(key, value)
+            return value, False
+
+    async def do_async(self, key, fn):
+        """
+        Like do() for a coroutine function, coalescing the tasks of one event loop
+        """
+        while True:
+            future = self._async_flights.get(key)
+            if future is not None:
+                self._count('coalesced')
+                try:
+                    return await asyncio.shield(future), True
+                except FlightAbandoned:
+                    continue
+
+            future = self._async_flights[key] = asyncio.get_running_loop().create_future()
+            self._count('leaders')
+            token, error = None, None
+            try:
+                token, value = await self._claim_async(key)
+                shared = token is None
+                if not shared:
+                    value = await fn()
+            except asyncio.CancelledError:
+                error = FlightAbandoned(key)
+                raise
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                del self._async_flights[key]
+                try:
+                    self._release(key, token, None if error else value, error)
+                finally:
+                    if error is None:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(error)
+                        # Nobody may be waiting, do not log it as unretrieved
+                        future.exception()
+            return value, shared
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights) + len(self._async_flights)
+        stats['shared_store'] = self.store is not None
+        return stats
@@ -54,12 +54,46 @@ class VideoPlayerExtractor {
         this.videoUrlInput.value = 'https://new17.ngefilm.site/ice-road-vengeance-2025/';
         this.searchInput.placeholder = 'e.g., Wednesday, Ice Road, Peacemaker...';
         
-        // Load latest uploads on initialization
-        setTimeout(() => {
+        // Latest uploads rendered into the page by the server need no API call
+        const latest = this.readInlinedLatestUploads();
+        if (latest) {
+            this.displayLatestUploads(latest);
+            this.displayHeroCarousel(latest);
+        } else {
+            // Both share one /api/latest request
             this.loadLatestUploads();
-            // Load hero carousel with latest uploads
             this.loadHeroCarousel();
-        }, 500); // Small delay to ensure DOM is fully loaded
+        }
+    }
+
+    readInlinedLatestUploads() {
+        const element = document.getElementById('latestUploadsData');
+        if (!element) {
+            return null;
+        }
+        try {
+            const data = JSON.parse(element.textContent);
+            return data && !data.error ? data : null;
+        } catch (error) {
+            return null;
+        }
+    }
+
+    fetchLatestUploads() {
+        // Callers waiting at the same time share one request
+        if (!this.latestRequest) {
+            this.latestRequest = fetch('/api/latest')
+                .then((response) => {
+                    if (!response.ok) {
+                        throw new Error(`HTTP error! status: ${response.status}`);
+                    }
+                    return response.json();
+                })
+                .finally(() => {
+                    this.latestRequest = null;
+                });
+        }
+        return this.latestRequest;
     }
 
     async extractPlayers() {
@@ -79,8 +113,8 @@ class VideoPlayerExtractor {
                 document.getElementById('loadingSection').scrollIntoView({ behavior: 'smooth' });
             }, 100); // Small delay to ensure the loading section is visible first
             
-            // Call the backend API
-            const response = await fetch('/api/extract', {
+            // Call the streaming backend API so servers show up as soon as they resolve
+            const response = await fetch('/api/extract/stream', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -92,9 +126,44 @@ class VideoPlayerExtractor {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             
-            const data = await response.json();
+            await this.readEventStream(response, (event) => this.handleExtractEvent(event));
             
-            // Process and display results
+        } catch (error) {
+            this.showError(error.message || 'Failed to extract players');
+        }
+    }
+
+    async readEventStream(response, onEvent) {
+        // Parse a newline-delimited JSON stream, one event per line
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+        }
+        
+        if (buffer.trim()) {
+            onEvent(JSON.parse(buffer));
+        }
+    }
+
+    handleExtractEvent(event) {
+        if (event.event === 'error') {
+            this.showError(event.error);
+        } else if (event.event === 'meta') {
+            // Title and server list are known, render them while players resolve
+            const data = { ...event };
+            delete data.event;
+            if (data.players) {
+                data.players = data.players.map(player => ({ ...player, pending: true }));
+            }
             this.extractedData = data;
             this.displayResults(data);
             
@@ -102,9 +171,10 @@ class VideoPlayerExtractor {
             setTimeout(() => {
                 document.getElementById('resultsSection').scrollIntoView({ behavior: 'smooth' });
             }, 100); // Small delay to ensure content is rendered
-            
-        } catch (error) {
-            this.showError(error.message || 'Failed to extract players');
+        } else if (event.event === 'player') {
+            this.updateMoviePlayer(event.index, event.player);
+        } else if (event.event === 'done' && !event.result.error) {
+            this.extractedData = event.result;
         }
     }
 
@@ -125,14 +195,8 @@ class VideoPlayerExtractor {
                 document.getElementById('loadingSection').scrollIntoView({ behavior: 'smooth' });
             }, 100); // Small delay to ensure the loading section is visible first
             
-            // Call the search API
-            const response = await fetch('/api/search', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({ query: query })
-            });
+            // Call the search API (GET so the browser and CDN can cache it)
+            const response = await fetch(`/api/search?query=${encodeURIComponent(query)}`);
             
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
@@ -168,18 +232,7 @@ class VideoPlayerExtractor {
             `;
             
             // Call the latest uploads API
-            const response = await fetch('/api/latest', {
-                method: 'GET',
-                headers: {
-                    'Content-Type': 'application/json',
-                }
-            });
-            
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const data = await response.json();
+            const data = await this.fetchLatestUploads();
             
             // Process and display latest uploads
             this.displayLatestUploads(data);
@@ -199,18 +252,7 @@ class VideoPlayerExtractor {
     async loadHeroCarousel() {
         try {
             // Call the latest uploads API to get data for hero carousel
-            const response = await fetch('/api/latest', {
-                method: 'GET',
-                headers: {
-                    'Content-Type': 'application/json',
-                }
-            });
-            
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
-            const data = await response.json();
+            const data = await this.fetchLatestUploads();
             
             // Process and display hero carousel
             this.displayHeroCarousel(data);
@@ -481,9 +523,9 @@ class VideoPlayerExtractor {
         this.episodeInfo.textContent = `Series (${episodeCount} episodes)`;
         this.episodeInfo.classList.remove('d-none');
         
-        // Update player count
+        // Update player count (players are loaded per episode on demand)
         const playerCount = data.episodes ? data.episodes.reduce((count, episode) => count + (episode.players ? episode.players.length : 0), 0) : 0;
-        this.playerCount.textContent = `${playerCount} Players Available`;
+        this.playerCount.textContent = playerCount > 0 ? `${playerCount} Players Available` : 'Select an episode';
         
         // Generate tabs for episodes
         this.generateSeriesTabs(data);
@@ -494,12 +536,31 @@ class VideoPlayerExtractor {
         this.episodeInfo.classList.add('d-none');
         
         // Update player count
-        this.playerCount.textContent = `${data.players.length} Players Available`;
+        this.updateMoviePlayerCount(data.players);
         
         // Generate tabs for movie players
         this.generateMovieTabs(data.players);
     }
 
+    updateMoviePlayerCount(players) {
+        const pending = players.filter(player => player.pending).length;
+        this.playerCount.textContent = pending > 0
+            ? `${players.length - pending} of ${players.length} Players Ready`
+            : `${players.length} Players Available`;
+    }
+
+    updateMoviePlayer(index, player) {
+        if (!this.extractedData || !this.extractedData.players) return;
+        
+        this.extractedData.players[index] = player;
+        this.updateMoviePlayerCount(this.extractedData.players);
+        
+        const tabContent = document.getElementById(`player-${index}`);
+        if (tabContent) {
+            tabContent.innerHTML = this.renderMoviePlayer(player);
+        }
+    }
+
     generateSeriesTabs(data) {
         // Clear existing tabs and content
         this.playersTab.innerHTML = '';
@@ -518,86 +579,153 @@ class VideoPlayerExtractor {
         
         // Create tabs for episodes
         data.episodes.forEach((episode, index) => {
-            const isActive = index === 0;
-            
-            // Create tab
-            const tab = document.createElement('li');
-            tab.className = 'nav-item';
-            tab.role = 'presentation';
-            
-            const tabLink = document.createElement('button');
-            tabLink.className = `nav-link ${isActive ? 'active' : ''}`;
-            tabLink.id = `tab-${index}`;
-            tabLink.dataset.bsToggle = 'tab';
-            tabLink.dataset.bsTarget = `#episode-${index}`;
-            tabLink.type = 'button';
-            tabLink.role = 'tab';
-            tabLink.textContent = episode.title || `Episode ${index + 1}`;
-            
-            tab.appendChild(tabLink);
-            this.playersTab.appendChild(tab);
-            
-            // Create tab content
-            const tabContent = document.createElement('div');
-            tabContent.className = `tab-pane fade ${isActive ? 'show active' : ''}`;
-            tabContent.id = `episode-${index}`;
-            tabContent.role = 'tabpanel';
+            this.appendEpisodeTab(episode, index, data.url, index === 0);
+        });
+        this.episodeTabCount = data.episodes.length;
+        
+        // Long series are paged, offer the next page of episodes
+        this.appendMoreEpisodesTab(data.url, data.next_cursor);
+    }
+
+    appendEpisodeTab(episode, index, seriesUrl, isActive) {
+        // Create tab
+        const tab = document.createElement('li');
+        tab.className = 'nav-item';
+        tab.role = 'presentation';
+        
+        const tabLink = document.createElement('button');
+        tabLink.className = `nav-link ${isActive ? 'active' : ''}`;
+        tabLink.id = `tab-${index}`;
+        tabLink.dataset.bsToggle = 'tab';
+        tabLink.dataset.bsTarget = `#episode-${index}`;
+        tabLink.type = 'button';
+        tabLink.role = 'tab';
+        tabLink.textContent = episode.title || `Episode ${index + 1}`;
+        
+        tab.appendChild(tabLink);
+        this.playersTab.appendChild(tab);
+        
+        // Create tab content
+        const tabContent = document.createElement('div');
+        tabContent.className = `tab-pane fade ${isActive ? 'show active' : ''}`;
+        tabContent.id = `episode-${index}`;
+        tabContent.role = 'tabpanel';
+        
+        if (episode.error) {
+            tabContent.innerHTML = `
+                <div class="alert alert-danger mt-3">
+                    <h5><i class="bi bi-exclamation-triangle"></i> Error loading episode</h5>
+                    <p>${episode.error}</p>
+                </div>
+            `;
+        } else {
+            // Create player content for this episode
+            const playerContentId = `player-content-${index}`;
             
-            if (episode.error) {
+            // Check if we have player data or need to lazy load it
+            if (episode.players && episode.players.length > 0) {
                 tabContent.innerHTML = `
-                    <div class="alert alert-danger mt-3">
-                        <h5><i class="bi bi-exclamation-triangle"></i> Error loading episode</h5>
-                        <p>${episode.error}</p>
+                    <h4 class="mt-3">${episode.title}</h4>
+                    <p>${episode.url}</p>
+                    <div id="${playerContentId}">
+                        <!-- Player tabs will be populated here -->
                     </div>
                 `;
+                
+                // Append to DOM so we can manipulate child elements
+                this.playersTabContent.appendChild(tabContent);
+                
+                // Generate player tabs for this episode
+                this.generateEpisodePlayerContent(episode.players, playerContentId);
             } else {
-                // Create player content for this episode
-                const playerContentId = `player-content-${index}`;
+                // Need to lazy load player data
+                tabContent.innerHTML = `
+                    <h4 class="mt-3">${episode.title}</h4>
+                    <p>${episode.url}</p>
+                    <div class="text-center mt-4">
+                        <button class="btn btn-primary load-players-btn" data-episode-url="${episode.url}" data-episode-index="${index}">
+                            <i class="bi bi-play-btn"></i> Load Player Options
+                        </button>
+                    </div>
+                    <div id="${playerContentId}" class="mt-3">
+                        <!-- Player content will be loaded here -->
+                    </div>
+                `;
                 
-                // Check if we have player data or need to lazy load it
-                if (episode.players && episode.players.length > 0) {
-                    tabContent.innerHTML = `
-                        <h4 class="mt-3">${episode.title}</h4>
-                        <p>${episode.url}</p>
-                        <div id="${playerContentId}">
-                            <!-- Player tabs will be populated here -->
-                        </div>
-                    `;
-                    
-                    // Append to DOM so we can manipulate child elements
-                    this.playersTabContent.appendChild(tabContent);
-                    
-                    // Generate player tabs for this episode
-                    this.generateEpisodePlayerContent(episode.players, playerContentId);
-                } else {
-                    // Need to lazy load player data
-                    tabContent.innerHTML = `
-                        <h4 class="mt-3">${episode.title}</h4>
-                        <p>${episode.url}</p>
-                        <div class="text-center mt-4">
-                            <button class="btn btn-primary load-players-btn" data-episode-url="${episode.url}" data-episode-index="${index}">
-                                <i class="bi bi-play-btn"></i> Load Player Options
-                            </button>
-                        </div>
-                        <div id="${playerContentId}" class="mt-3">
-                            <!-- Player content will be loaded here -->
-                        </div>
-                    `;
-                    
-                    // Append to DOM
-                    this.playersTabContent.appendChild(tabContent);
-                    
-                    // Add event listener to load button
-                    const loadButton = tabContent.querySelector('.load-players-btn');
-                    loadButton.addEventListener('click', () => this.loadEpisodePlayers(episode.url, index, playerContentId));
+                // Append to DOM
+                this.playersTabContent.appendChild(tabContent);
+                
+                // Add event listener to load button
+                const loadButton = tabContent.querySelector('.load-players-btn');
+                const loadPlayers = () => {
+                    if (loadButton.dataset.loaded) return;
+                    loadButton.dataset.loaded = 'true';
+                    loadButton.classList.add('d-none');
+                    this.loadEpisodePlayers(episode.url, index, playerContentId, seriesUrl);
+                };
+                loadButton.addEventListener('click', loadPlayers);
+                
+                // Load players automatically when the episode tab is opened
+                tabLink.addEventListener('shown.bs.tab', loadPlayers);
+                if (isActive) {
+                    loadPlayers();
                 }
             }
+        }
+        
+        this.playersTabContent.appendChild(tabContent);
+    }
+
+    appendMoreEpisodesTab(seriesUrl, cursor) {
+        if (!cursor) return;
+        
+        const tab = document.createElement('li');
+        tab.className = 'nav-item more-episodes-tab';
+        tab.role = 'presentation';
+        
+        const button = document.createElement('button');
+        button.className = 'nav-link';
+        button.type = 'button';
+        button.innerHTML = '<i class="bi bi-plus-circle"></i> More episodes';
+        button.addEventListener('click', () => this.loadMoreEpisodes(seriesUrl, cursor, tab, button));
+        
+        tab.appendChild(button);
+        this.playersTab.appendChild(tab);
+    }
+
+    async loadMoreEpisodes(seriesUrl, cursor, tab, button) {
+        button.disabled = true;
+        button.innerHTML = '<span class="spinner-border spinner-border-sm" role="status"></span> Loading...';
+        
+        try {
+            const response = await fetch('/api/series/episodes', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ url: seriesUrl, cursor: cursor })
+            });
             
-            this.playersTabContent.appendChild(tabContent);
-        });
+            const data = await response.json();
+            if (!response.ok || data.error) {
+                throw new Error(data.error || `HTTP error! status: ${response.status}`);
+            }
+            
+            tab.remove();
+            data.episodes.forEach(episode => {
+                this.appendEpisodeTab(episode, this.episodeTabCount, seriesUrl, false);
+                this.episodeTabCount += 1;
+            });
+            this.appendMoreEpisodesTab(seriesUrl, data.next_cursor);
+            
+        } catch (error) {
+            console.error('Error loading more episodes:', error);
+            button.disabled = false;
+            button.innerHTML = '<i class="bi bi-arrow-clockwise"></i> Retry loading episodes';
+        }
     }
 
-    async loadEpisodePlayers(episodeUrl, episodeIndex, contentContainerId) {
+    async loadEpisodePlayers(episodeUrl, episodeIndex, contentContainerId, seriesUrl) {
         try {
             // Show loading indicator
             const contentContainer = document.getElementById(contentContainerId);
@@ -616,15 +744,15 @@ class VideoPlayerExtractor {
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ url: episodeUrl })
+                body: JSON.stringify({ url: episodeUrl, series_url: seriesUrl })
             });
             
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            
             const players = await response.json();
             
+            if (!response.ok || players.error) {
+                throw new Error(players.error || `HTTP error! status: ${response.status}`);
+            }
+            
             // Generate player content for this episode
             this.generateEpisodePlayerContent(players, contentContainerId);
             
@@ -792,54 +920,69 @@ class VideoPlayerExtractor {
             tabContent.id = `player-${index}`;
             tabContent.role = 'tabpanel';
             
-            if (player.error) {
-                tabContent.innerHTML = `
-                    <div class="alert alert-warning mt-3">
-                        <h5><i class="bi bi-exclamation-triangle"></i> Error loading player</h5>
-                        <p>${player.error}</p>
+            tabContent.innerHTML = this.renderMoviePlayer(player);
+            
+            this.playersTabContent.appendChild(tabContent);
+        });
+    }
+
+    renderMoviePlayer(player) {
+        if (player.pending) {
+            return `
+                <div class="text-center mt-4">
+                    <div class="spinner-border text-danger" role="status">
+                        <span class="visually-hidden">Loading...</span>
                     </div>
-                `;
-            } else if (player.iframe_url) {
-                tabContent.innerHTML = `
-                    <div class="mt-3">
-                        <div class="d-flex justify-content-between align-items-center mb-3">
-                            <h5 class="h5 mb-0">${player.server_name}</h5>
-                            <div>
-                                <span class="badge bg-info">${player.type || 'Stream'}</span>
-                                ${player.quality ? `<span class="badge bg-success ms-2">${player.quality}</span>` : ''}
-                            </div>
-                        </div>
-                        
-                        <div class="player-container mb-3">
-                            <iframe 
-                                src="${player.iframe_url}" 
-                                class="player-frame"
-                                allowfullscreen
-                                loading="lazy">
-                            </iframe>
-                        </div>
-                        
-                        <div class="d-flex justify-content-between align-items-center">
-                            <small class="text-muted">
-                                <i class="bi bi-link"></i> ${player.iframe_url}
-                            </small>
-                            <button class="btn btn-outline-danger btn-sm" onclick="copyUrl('${player.iframe_url}')">
-                                <i class="bi bi-clipboard"></i> Copy URL
-                            </button>
+                    <p class="mt-2 text-light">Resolving ${player.server_name}...</p>
+                </div>
+            `;
+        }
+        
+        if (player.error) {
+            return `
+                <div class="alert alert-warning mt-3">
+                    <h5><i class="bi bi-exclamation-triangle"></i> Error loading player</h5>
+                    <p>${player.error}</p>
+                </div>
+            `;
+        } else if (player.iframe_url) {
+            return `
+                <div class="mt-3">
+                    <div class="d-flex justify-content-between align-items-center mb-3">
+                        <h5 class="h5 mb-0">${player.server_name}</h5>
+                        <div>
+                            <span class="badge bg-info">${player.type || 'Stream'}</span>
+                            ${player.quality ? `<span class="badge bg-success ms-2">${player.quality}</span>` : ''}
                         </div>
                     </div>
-                `;
-            } else {
-                tabContent.innerHTML = `
-                    <div class="alert alert-info mt-3">
-                        <h5><i class="bi bi-info-circle"></i> No player URL available</h5>
-                        <p>This player doesn't have a valid URL.</p>
+
+                    <div class="player-container mb-3">
+                        <iframe 
+                            src="${player.iframe_url}" 
+                            class="player-frame"
+                            allowfullscreen
+                            loading="lazy">
+                        </iframe>
                     </div>
-                `;
-            }
-            
-            this.playersTabContent.appendChild(tabContent);
-        });
+
+                    <div class="d-flex justify-content-between align-items-center">
+                        <small class="text-muted">
+                            <i class="bi bi-link"></i> ${player.iframe_url}
+                        </small>
+                        <button class="btn btn-outline-danger btn-sm" onclick="copyUrl('${player.iframe_url}')">
+                            <i class="bi bi-clipboard"></i> Copy URL
+                        </button>
+                    </div>
+                </div>
+            `;
+        } else {
+            return `
+                <div class="alert alert-info mt-3">
+                    <h5><i class="bi bi-info-circle"></i> No player URL available</h5>
+                    <p>This player doesn't have a valid URL.</p>
+                </div>
+            `;
+        }
     }
 }
 
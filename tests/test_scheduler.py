@@ -0,0 +1,102 @@
+"""
+Interactive fetches overtake queued batch work, through the fetch pool and
+through the asyncio engine.
+
+Runs against the fixture origin in bench/origin.py, no network needed.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, 'bench')]
+
+from fetch_pool import FetchPool  # noqa: E402
+from origin import Origin  # noqa: E402
+from pages import FetchContext  # noqa: E402
+from scheduler import scheduler, priority  # noqa: E402
+
+RATE = 10
+
+
+def fetch(url, pages):
+    return pages.get(url)
+
+
+def test_interactive_request_overtakes_queued_batch(monkeypatch):
+    origin = Origin().start()
+    # The origin's port is new, so its host queue is created with these
+    monkeypatch.setattr(scheduler, 'rate', RATE)
+    monkeypatch.setattr(scheduler, 'burst', 1)
+    # Fewer pool threads and host slots than queued batch fetches
+    pool = FetchPool(max_workers=2, per_host_limit=2)
+    try:
+        batch_urls = [f'{origin.base_url}/batch-{n}/?player=1' for n in range(20)]
+        batch_done = threading.Event()
+
+        def run_batch():
+            with priority('batch'):
+                pages = FetchContext()
+                pool.map(fetch, batch_urls, pages, admit=pages.admit)
+            batch_done.set()
+
+        threading.Thread(target=run_batch, daemon=True).start()
+        # Let the batch take the burst and queue up behind the rate limit
+        time.sleep(3 / RATE)
+
+        started = time.monotonic()
+        pages = FetchContext()
+        pool.map(fetch, [f'{origin.base_url}/interactive-{n}/?player=1' for n in range(3)], pages, admit=pages.admit)
+        elapsed = time.monotonic() - started
+
+        # 3 tokens at RATE per second, not the ~1.7s the batch still needs
+        assert elapsed < 6 / RATE
+        assert not batch_done.is_set()
+        assert batch_done.wait(30)
+        assert origin.stats()['player'] == len(batch_urls) + 3
+    finally:
+        origin.stop()
+
+
+def test_async_interactive_fetch_overtakes_queued_batch(monkeypatch):
+    pytest.importorskip('aiohttp')
+    # async_scraper imports the app, keep its import free of side effects
+    monkeypatch.setenv('WARMER_ENABLED', '0')
+    monkeypatch.setenv('ASSETS_BUILD', '0')
+    monkeypatch.setenv('IMAGE_CACHE_DIR', tempfile.mkdtemp())
+    from async_scraper import AsyncScraper
+
+    origin = Origin().start()
+    monkeypatch.setattr(scheduler, 'rate', RATE)
+    monkeypatch.setattr(scheduler, 'burst', 1)
+    engine = AsyncScraper(per_host_limit=2)
+
+    async def run():
+        with priority('batch'):
+            batch = asyncio.gather(*[
+                engine.fetch_page(f'{origin.base_url}/batch-{n}/?player=1') for n in range(20)
+            ])
+        await asyncio.sleep(3 / RATE)
+
+        started = time.monotonic()
+        await asyncio.gather(*[
+            engine.fetch_page(f'{origin.base_url}/interactive-{n}/?player=1') for n in range(3)
+        ])
+        elapsed = time.monotonic() - started
+        batch_running = not batch.done()
+        await batch
+        return elapsed, batch_running
+
+    try:
+        elapsed, batch_running = asyncio.run(run())
+        assert elapsed < 6 / RATE
+        assert batch_running
+        assert origin.stats()['player'] == 23
+    finally:
+        asyncio.run(engine.close())
+        origin.stop()
@@ -0,0 +1,154 @@
+"""
+Background warmer for the extraction cache.
+
+Crawls the latest uploads at a fixed interval and pre-extracts players for
+every item that is new, changed or no longer cached, so clicking a featured
+title on the home page is a cache hit. All upstream requests made while
+warming are charged to one global rate budget.
+
+Every worker process runs its own warmer. An optional claim_run() decides
+whether this worker warms at all in a given run, so workers sharing a cache
+can leave each run to one of them.
+"""
+import threading
+import time
+
+from cache import has_errors
+
+
+class Warmer:
+    """
+    Periodically warm the items returned by list_items().
+
+    list_items() returns the latest uploads result, is_cached(item) tells
+    whether an item's extraction is still cached and warm_item(item, budget)
+    extracts it into the cache, returning the result. claim_run() returns
+    whether this worker should warm now, runs it declines are skipped.
+    """
+
+    def __init__(self, list_items, is_cached, warm_item, interval, budget, claim_run=None):
+        self.list_items = list_items
+        self.is_cached = is_cached
+        self.warm_item = warm_item
+        self.interval = interval
+        self.budget = budget
+        self.claim_run = claim_run
+        self._lock = threading.Lock()
+        self._items = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_run = None
+        self._last_run_seconds = None
+        self._next_run = None
+        self._last_error = None
+        self._skipped_runs = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name='warmer', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.claim_run is None or self.claim_run():
+                    self.run_once()
+                else:
+                    # Another worker warms the shared cache this time
+                    self._skipped_runs += 1
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Error warming latest uploads: {e}")
+            self._next_run = time.time() + self.interval
+            self._stop.wait(self.interval)
+
+    @staticmethod
+    def _signature(item):
+        # Title changes when a series gets a new episode
+        return (item.get('title'), item.get('image_url'), item.get('rating'))
+
+    def run_once(self):
+        """
+        Warm every new, changed or expired item once, returns how many were extracted
+        """
+        started = time.time()
+        latest = self.list_items()
+        if 'error' in latest:
+            raise RuntimeError(latest['error'])
+
+        warmed = 0
+        current_urls = []
+        for item in latest.get('items', []):
+            url = item['url']
+            current_urls.append(url)
+            signature = self._signature(item)
+            with self._lock:
+                entry = self._items.get(url)
+            changed = entry is None or entry['signature'] != signature
+            if not changed and self.is_cached(item):
+                continue
+
+            with self._lock:
+                self._items[url] = {
+                    'title': item.get('title'),
+                    'signature': signature,
+                    'status': 'warming',
+                    'warmed_at': entry['warmed_at'] if entry else None,
+                    'error': None,
+                }
+
+            try:
+                result = self.warm_item(item, self.budget, changed)
+                error = result.get('error')
+                if error is not None:
+                    status = 'error'
+                else:
+                    status = 'partial' if has_errors(result) else 'ok'
+            except Exception as e:
+                status, error = 'error', str(e)
+
+            with self._lock:
+                self._items[url].update(status=status, error=error, warmed_at=time.time())
+            warmed += 1
+
+        # Forget items that dropped off the latest uploads
+        with self._lock:
+            for url in list(self._items):
+                if url not in current_urls:
+                    del self._items[url]
+
+        self._last_run = started
+        self._last_run_seconds = round(time.time() - started, 3)
+        self._last_error = None
+        return warmed
+
+    def status(self):
+        now = time.time()
+        with self._lock:
+            items = [
+                {
+                    'url': url,
+                    'title': entry['title'],
+                    'status': entry['status'],
+                    'error': entry['error'],
+                    'age': None if entry['warmed_at'] is None else round(now - entry['warmed_at'], 1),
+                }
+                for url, entry in self._items.items()
+            ]
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval': self.interval,
+            'last_run_age': None if self._last_run is None else round(now - self._last_run, 1),
+            'last_run_seconds': self._last_run_seconds,
+            'next_run_in': None if self._next_run is None else round(max(0.0, self._next_run - now), 1),
+            'last_error': self._last_error,
+            'skipped_runs': self._skipped_runs,
+            'budget_tokens_available': round(self.budget.available(), 2),
+            'warm_items': sum(1 for item in items if item['status'] in ('ok', 'partial')),
+            'items': items,
+        }